@@ -3,13 +3,23 @@
 # Define a package-level variable
 __version__ = '1.0.0'
 __date__ = '20.07.2024'
-__all__ = ['allam', 'combustion', 'recuperator', 'phasediagrCO2', 'property_sCO2_cp', 'combustion', 'spHvol', 'phasediagrCO2mix']
+__all__ = ['allam', 'combustion', 'recuperator', 'phasediagrCO2', 'property_sCO2_cp', 'combustion', 'spHvol', 'phasediagrCO2mix', 'fluidstate', 'tabular', 'tempsolver', 'sweep', 'cyclecore', 'cycleoptim', 'partload', 'saturation', 'tsdiagram', 'envelope']
 
+from .fluidstate import *
+from .tabular import *
+from .saturation import *
+from .envelope import *
 from .combustion import *
 from .phasediagrCO2 import *
 from .spHvol import *
 from .property_sCO2_cp import *
+from .tempsolver import *
+from .sweep import *
+from .cyclecore import *
+from .tsdiagram import *
+from .recuperator import *
+from .cycleoptim import *
 from .allam import *
+from .partload import *
 from .phasediagrCO2mix import *
-from .recuperator import *
 
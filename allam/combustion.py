@@ -12,146 +12,321 @@ Created on Sun Jan  7 10:38:03 2024
     - коэффициент разбавления
     - состав газа на выходе КС
 
+combustor() - экземпляр Combust из кэша (на состав топлива и поток),
+reset() - сброс результатов для повторного использования
+
 Температура в К
 """
 
+import threading
 import pandas as pd
 import numpy as np
-from CoolProp.CoolProp import PropsSI
-from scipy.optimize import root
 import matplotlib.pyplot as plt
 from scipy import constants as cst
+from allam.spHvol import species, thermo_table
 
 pd.set_option('display.float_format', '{:.4f}'.format)
 pd.set_option('display.max_columns', None)
 pd.options.mode.chained_assignment = None  # default='warn'
 
+_cache = threading.local()
+
+class Composition:
+    '''
+    СОСТАВ ГАЗА - молярные массы, мольные и массовые доли компонентов
+    (массивы numpy в порядке names: arr['mol'], ...), таблица DataFrame - по запросу
+    (to_frame); mol, mass, mol_mass, gas['mol'], loc - доступ по имени как в DataFrame
+    '''
+    __slots__ = ('names', 'index', 'arr')
+
+    columns = ('mol_mass', 'mol', 'mass')
+
+    def __init__(self, names, mol_mass):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.arr = {'mol_mass': np.asarray(mol_mass, dtype=float),
+                    'mol': np.full(len(self.names), np.nan),
+                    'mass': np.full(len(self.names), np.nan)}
+
+        # ЗНАЧЕНИЕ ПО КОМПОНЕНТУ: get('mol', 'CO2')
+    def get(self, column, name):
+        return self.arr[column][self.index[name]]
+
+        # СТОЛБЕЦ С ИМЕНАМИ КОМПОНЕНТОВ: gas['mol']['CO2'], gas.mol['CO2']
+    def __getitem__(self, column):
+        return pd.Series(self.arr[column], index=list(self.names), name=column)
+
+    @property
+    def mol_mass(self):
+        return self['mol_mass']
+
+    @property
+    def mol(self):
+        return self['mol']
+
+    @property
+    def mass(self):
+        return self['mass']
+
+    @property
+    def loc(self):
+        return self.to_frame().loc
+
+    def to_frame(self):
+        return pd.DataFrame({col: self.arr[col] for col in self.columns}, index=list(self.names))
+
+    def __repr__(self):
+        return repr(self.to_frame())
+
+
 class Combust:
-    def __init__(self):
-        
-        # топливо - метан
+    def __init__(self, fuel=None, oxidant=None, excess_O2=0.):
+        # fuel - состав топлива (мольные доли), по умолчанию метан {'CH4': 1.}
+        #        компоненты: CH4, C2H6, C3H8, H2, CO, CO2, H2O, O2, N2, Ar
+        # oxidant - состав окислителя, по умолчанию кислород {'O2': 1.}
+        # excess_O2 - избыток кислорода сверх стехиометрии (доля)
         self.temp0 = cst.convert_temperature(0, 'C', 'K') # 'C', 'K', 'F', 'R'
         
-        self.fuel = pd.Series({'fluid': 'methane', 'calorific': 35800000.})
+        self.fuel = self._normalize(fuel or {'CH4': 1.}, 'fuel')
+        self.oxidant = self._normalize(oxidant or {'O2': 1.}, 'oxidant')
+        if 'O2' not in self.oxidant:
+            raise ValueError('oxidant must contain O2')
+        self.excess_O2 = excess_O2
+        self.temp_O2 = 15 # температура окислителя [°C]
         
-        self.gas = pd.DataFrame(columns=['mol_mass', 'mol', 'mass'], 
-                              index=['CO2', 'H2O', 'CO2_recyc'], dtype=float)
+        # низшая теплота сгорания топлива [Дж/м3]
+        self.calorific = sum(x * species[name][4] for name, x in self.fuel.items())
+        self._stoich()
         
-        self.gas.loc['CO2', 'mol_mass'] = PropsSI('molarmass','CO2')
-        self.gas.loc['CO2_recyc', 'mol_mass'] = PropsSI('molarmass','CO2')
-        self.gas.loc['H2O', 'mol_mass'] = PropsSI('molarmass','H2O')
+        # молярные массы и полиномы теплоемкости - общая таблица (один раз на процесс)
+        self.mol_mass, self.spHv_pol = thermo_table()
+        for name in self.oxidant:
+            if name not in self.spHv_pol:
+                raise ValueError('no heat capacity data for oxidant component ' + name)
+        self.spHv_CO2_pol = self.spHv_pol['CO2']
+        self.spHv_H2O_pol = self.spHv_pol['H2O']
+        self.spHv_O2_pol = self.spHv_pol['O2']
         
-        self.gas_in = pd.DataFrame(columns=['mol_mass', 'mol', 'mass'],
-                index=['CH4', 'O2', 'CO2'], dtype=float)
+        # продукты сгорания и газ на входе
+        self.gas = Composition(list(self.products) + ['CO2_recyc'],
+                               [self.mol_mass[name] for name in self.products] +
+                               [self.mol_mass['CO2']])
         
-        self.gas_in.loc['CH4', 'mol_mass'] = PropsSI('molarmass','CH4')
-        self.gas_in.loc['O2', 'mol_mass'] = PropsSI('molarmass','O2')
-        self.gas_in.loc['CO2', 'mol_mass'] = PropsSI('molarmass','CO2')
+        self.gas_in = Composition(list(self.reactants),
+                                  [self.mol_mass[name] for name in self.reactants])
+        self.reset()
 
-        spHvol_CO2_coef = [1.63479959e+03, 9.75263813e-01, -5.45793612e-04, 1.83324681e-07, -2.67917924e-11]
-        spHvol_H2O_coef = [1.49735370e+03, 1.18320983e-01, 1.79154428e-04, -8.92543875e-08, 1.34614261e-11]
-        spHvol_O2_coef = [1.30543577e+03, 1.74761949e-01, 6.42329236e-05, -8.82987243e-08, 2.28704857e-11]
+        # СБРОС РЕЗУЛЬТАТОВ РАСЧЕТА (топливо и окислитель сохраняются)
+    def reset(self):
+        self.k_recyc = np.nan
+        self.temp_recyc = np.nan
+        for comp in (self.gas, self.gas_in):
+            comp.arr['mol'][:] = np.nan
+            comp.arr['mass'][:] = np.nan
+        self.g = pd.Series({'gas_vol': np.nan})
 
-        self.spHv_CO2_pol = np.polynomial.Polynomial(spHvol_CO2_coef)
-        self.spHv_H2O_pol = np.polynomial.Polynomial(spHvol_H2O_coef)
-        self.spHv_O2_pol = np.polynomial.Polynomial(spHvol_O2_coef)
+    @staticmethod
+    def _normalize(comp, kind):
+        for name in comp:
+            if name not in species:
+                raise ValueError('unknown ' + kind + ' component: ' + str(name))
+        total = sum(comp.values())
+        return {name: x / total for name, x in comp.items() if x > 0}
+
+        # СТЕХИОМЕТРИЯ НА 1 м3 ТОПЛИВА
+    def _stoich(self):
+        carbon, hydrogen, oxygen = [sum(x * species[name][i] for name, x in self.fuel.items())
+                                    for i in (1, 2, 3)]
+        
+        # Количество кислорода, необходимое для сжигания топлива м3/м3
+        self.volume_O2_stoich = carbon + hydrogen / 4 - oxygen / 2
+        self.volume_O2 = self.volume_O2_stoich * (1 + self.excess_O2)
+        self.volume_fuel = 1
+        volume_oxidant = self.volume_O2 / self.oxidant['O2']
+        
+        # Газ на входе при k_recyc=0: топливо, окислитель (рециркулируемый CO2 - отдельно)
+        self.reactants = dict(self.fuel)
+        for name, x in self.oxidant.items():
+            self.reactants[name] = self.reactants.get(name, 0) + x * volume_oxidant
+        self.reactants.setdefault('CO2', 0)
         
-        self.g = pd.Series([np.nan], index=['gas_vol'])
+        # Объем продуктов сгорания при k_recyc=0: CO2, H2O, инертные, избыток O2
+        self.products = {'CO2': carbon, 'H2O': hydrogen / 2}
+        for name in ('N2', 'Ar'):
+            volume = self.fuel.get(name, 0) + self.oxidant.get(name, 0) * volume_oxidant
+            if volume > 0:
+                self.products[name] = volume
+        if self.volume_O2 > self.volume_O2_stoich:
+            self.products['O2'] = self.volume_O2 - self.volume_O2_stoich
+        if self.products['H2O'] == 0:
+            del self.products['H2O']
+        self.volume_gas_norm = sum(self.products.values())
         
+        # ФИЗИЧЕСКОЕ ТЕПЛО ОКИСЛИТЕЛЯ НА 1 м3 ТОПЛИВА
+    def _heatOxidant(self):
+        return sum(self.spHv_pol[name](self.temp_O2) * self.temp_O2 * x * self.volume_O2 / self.oxidant['O2']
+                   for name, x in self.oxidant.items())
         
     # РАСЧЕТ СОСТАВА ПРОДУКТОВ СГОРАНИЯ
     def _massFraction(self, k_recyc):         
         self.k_recyc = k_recyc
-        
-        # Количество кислорода, необходимое для сжигания топлива м3/м3
-        self.volume_O2 = 2
-        self.volume_CH4 = 1        
-        
-        # Объем продуктов сгорания при k_recyc=1
-        self.volume_H2O = 2
-        self.volume_CO2_norm = 1
-        self.volume_gas_norm = self.volume_H2O + self.volume_CO2_norm
+        comp = self._compositionArr(k_recyc)
         
         # Объем продуктов сгорания при k_recyc>1
         self.volume_CO2_recyc = self.volume_gas_norm * self.k_recyc
-        self.volume_gas = self.volume_gas_norm * ( self.k_recyc + 1 )
-        self.volume_CO2 = self.volume_gas - self.volume_H2O
+        self.volume_gas = float(comp['gas_vol'])
+        self.volume_CO2 = self.volume_gas - (self.volume_gas_norm - self.products['CO2'])
+        self.volume_H2O = self.products.get('H2O', 0)
         
         # Объем продуктов сгорания
         self.g['gas_vol'] = self.volume_gas
 
-        # Состав продуктов сгорания - мольные доли
-        self.gas.mol.at['CO2'] = self.volume_CO2 / self.g.gas_vol
-        self.gas.mol.at['CO2_recyc'] = self.volume_CO2_recyc / self.g.gas_vol
-        self.gas.mol.at['H2O'] = self.volume_H2O / self.g.gas_vol
-        self.g['mol_mass'] = (self.gas.mol_mass[0:2] * self.gas.mol[0:2]).sum()
-
-
-
-        # Массовые доли продуктов сгорания
-        self.gas.loc[:,'mass'] = (self.gas.mol * self.gas.mol_mass / self.g.mol_mass).round(4)
-        self.g['gas_mass_sum'] = self.gas.mass.sum()
+        # Состав продуктов сгорания - мольные и массовые доли
+        gas = self.gas
+        gas.arr['mol'][:] = [comp['mol_' + name] for name in gas.names]
+        gas.arr['mass'][:] = [comp['mass_' + name] for name in gas.names]
+        self.g['mol_mass'] = float(comp['mol_mass'])
+        self.g['gas_mass_sum'] = float(gas.arr['mass'].sum())
         
-        # Мольные доли газа на входе
-        self.volume_in = self.volume_O2 + self.volume_CH4 + self.volume_CO2_recyc
-        self.gas_in.mol.at['O2'] = self.volume_O2 / self.volume_in
-        self.gas_in.mol.at['CH4'] = self.volume_CH4 / self.volume_in
-        self.gas_in.mol.at['CO2'] = self.volume_CO2_recyc / self.volume_in 
-        
-        # Массовые доли газа на входе
-        self.gas_in_mol_mass = (self.gas_in.mol_mass * self.gas_in.mol).sum()
-        self.gas_in.mass = (self.gas_in.mol * self.gas_in.mol_mass / self.gas_in_mol_mass).round(4)
+        # Мольные и массовые доли газа на входе
+        gas_in = self.gas_in
+        self.volume_in = float(comp['volume_in'])
+        gas_in.arr['mol'][:] = [comp['mol_in_' + name] for name in gas_in.names]
+        gas_in.arr['mass'][:] = [comp['mass_in_' + name] for name in gas_in.names]
+        self.gas_in_mol_mass = float(comp['mol_mass_in'])
         
         
 
-    # ФУНКЦИЯ РАСЧЕТА ТЕМПЕРАТУРЫ ГОРЕНИЯ
-    def _tempFunc(self, temp):
+        #РАСЧЕТ ТЕМПЕРАТУРЫ ГОРЕНИЯ
+    def _burnTemp(self, k_recyc, temp_recyc): # расчет температуры (жаропроизводительность)
+        self.temp_recyc = temp_recyc 
+        self._massFraction(k_recyc=k_recyc) # расчет фракционного состава продуктов сгорания
         
-        sph_CO2 = self.spHv_CO2_pol(temp) 
-        sph_H2O = self.spHv_H2O_pol(temp)
+        # self.g['temp_gas'] = temp_gas
+        return float(self._burnTempArr(k_recyc, temp_recyc))
+
+        # РАСЧЕТ К-АЛЬФА ПО ТЕПМЕРАТУРЕ ГОРЕНИЯ
+    def burnAlpha(self, temp_gas, temp_recyc): # расчет k_alpha
+        k_recyc = float(self._burnAlphaArr(temp_gas, temp_recyc))
         
-        temp_O2 = 15
-        sph_O2 = self.spHv_O2_pol(temp_O2)
+        # состав продуктов сгорания при найденном k_recyc
+        self.temp_recyc = temp_recyc - self.temp0
+        self._massFraction(k_recyc=k_recyc)
+        return k_recyc
+
+        # РАСЧЕТ К-АЛЬФА И СОСТАВА ДЛЯ МАССИВА РЕЖИМОВ (без pandas)
+    def burnArr(self, temp_gas, temp_recyc):
+        k_recyc = self._burnAlphaArr(temp_gas, temp_recyc)
+        return k_recyc, self._compositionArr(k_recyc)
+
+        # ТЕМПЕРАТУРА ГОРЕНИЯ ДЛЯ МАССИВА РЕЖИМОВ [°C]
+    def _burnTempArr(self, k_recyc, temp_recyc, tol=1e-10, maxiter=50):
+        # уравнение теплового баланса - полином по температуре, метод Ньютона
+        k_recyc = np.asarray(k_recyc, dtype=float)
+        temp_recyc = np.asarray(temp_recyc, dtype=float)
+        volume_CO2_recyc = self.volume_gas_norm * k_recyc
         
+        heat = (self.calorific + self._heatOxidant() +
+                self.spHv_CO2_pol(temp_recyc) * temp_recyc * volume_CO2_recyc)
         
-        q_phisic = (sph_O2 * temp_O2 * self.volume_O2 +
-                    self.spHv_CO2_pol(self.temp_recyc) * self.temp_recyc * self.volume_CO2_recyc)
+        volume = {name: v + volume_CO2_recyc if name == 'CO2' else v
+                  for name, v in self.products.items()}
+        dpol = {name: self.spHv_pol[name].deriv() for name in volume}
         
-        temp_resedual = abs((self.fuel.calorific +  q_phisic)/ 
-                (sph_CO2 * self.volume_CO2 + sph_H2O * self.volume_H2O) - temp)
+        temp = np.full(np.broadcast(k_recyc, temp_recyc).shape, 1000.)
+        for _ in range(maxiter):
+            sph = sum(v * self.spHv_pol[name](temp) for name, v in volume.items())
+            dsph = sum(v * dpol[name](temp) for name, v in volume.items())
+            step = (temp * sph - heat) / (sph + temp * dsph)
+            temp = temp - step
+            if np.all(np.abs(step) < tol * np.abs(temp)):
+                break
+        return temp
+
+        # РАСЧЕТ К-АЛЬФА ДЛЯ МАССИВА РЕЖИМОВ
+    def _burnAlphaArr(self, temp_gas, temp_recyc):
+        # тепловой баланс линеен по k_recyc при заданной температуре горения
+        temp_gas = np.asarray(temp_gas, dtype=float) - self.temp0
+        temp_recyc = np.asarray(temp_recyc, dtype=float) - self.temp0
+
+        q_gas = temp_gas * self.spHv_CO2_pol(temp_gas)
+        q_recyc = temp_recyc * self.spHv_CO2_pol(temp_recyc)
         
-        return temp_resedual
+        # тепло продуктов сгорания при k_recyc=0
+        q_norm = self.products['CO2'] * q_gas
+        for name, v in self.products.items():
+            if name != 'CO2':
+                q_norm = q_norm + v * temp_gas * self.spHv_pol[name](temp_gas)
 
-        #РАСЧЕТ ТЕМПЕРАТУРЫ ГОРЕНИЯ
-    def _burnTemp(self, k_recyc, temp_recyc): # расчет температуры (жаропроизводительность)
-        self.temp_recyc = temp_recyc 
-        self._massFraction(k_recyc=k_recyc) # расчет фракционного состава продуктов сгорания
+        k_recyc = ((self.calorific + self._heatOxidant() - q_norm) /
+                   (self.volume_gas_norm * (q_gas - q_recyc)))
+        return k_recyc
+
+        # СОСТАВ ПРОДУКТОВ СГОРАНИЯ И ГАЗА НА ВХОДЕ ДЛЯ МАССИВА К-АЛЬФА
+    def _compositionArr(self, k_recyc):
+        k_recyc = np.asarray(k_recyc, dtype=float)
+        volume_CO2_recyc = self.volume_gas_norm * k_recyc
+        volume_gas = self.volume_gas_norm * (k_recyc + 1)
+        volume_in = sum(self.reactants.values()) + volume_CO2_recyc
+        mol_mass = self.mol_mass
         
-        sol = root(self._tempFunc, 1000)
-        # self.g['temp_gas'] = sol.x[0]
-        return sol.x[0]
+        # продукты сгорания: CO2 - с рециркулируемым
+        comp = {'gas_vol': volume_gas, 'volume_in': volume_in}
+        for name, v in self.products.items():
+            if name != 'CO2':
+                comp['mol_' + name] = v / volume_gas
+        comp['mol_CO2'] = (volume_gas - (self.volume_gas_norm - self.products['CO2'])) / volume_gas
+        comp['mol_CO2_recyc'] = volume_CO2_recyc / volume_gas
+        comp['mol_mass'] = sum(mol_mass[name] * comp['mol_' + name] for name in self.products)
+        for name in self.gas.names:
+            comp['mass_' + name] = np.round(comp['mol_' + name] * mol_mass[name.replace('_recyc', '')] /
+                                            comp['mol_mass'], 4)
+
+        # газ на входе: топливо, окислитель, CO2 с рециркулируемым
+        for name, v in self.reactants.items():
+            comp['mol_in_' + name] = (v + volume_CO2_recyc if name == 'CO2' else v) / volume_in
+        comp['mol_mass_in'] = sum(mol_mass[name] * comp['mol_in_' + name] for name in self.reactants)
+        for name in self.reactants:
+            comp['mass_in_' + name] = np.round(comp['mol_in_' + name] * mol_mass[name] /
+                                               comp['mol_mass_in'], 4)
+        return comp
+
+        # СТРОКА COOLPROP СМЕСИ ПРОДУКТОВ СГОРАНИЯ
+    def fluidMix(self, comp=None):
+        # comp - результат burnArr (массивы), по умолчанию - текущий состав .gas
+        if comp is None:
+            mol = {name: self.gas.get('mol', name) for name in self.products}
+            return self._fluid(mol)
+        shape = np.shape(comp['mol_CO2'])
+        fluid = np.empty(shape, dtype=object)
+        for i in np.ndindex(shape):
+            fluid[i] = self._fluid({name: np.asarray(comp['mol_' + name])[i] for name in self.products})
+        return fluid
+
+    def _fluid(self, mol):
+        mol = {name: float(mol[name]) for name in self.products if not float(mol[name]) <= 0}
+        if set(mol) <= {'CO2', 'H2O'}:
+            # CO2/H2O - доля CO2 до 0.001, как в cycle_mix_state (ключ MixTable)
+            mol_CO2 = round(mol.get('CO2', 0.), 3)
+            if 'H2O' not in self.products:
+                return 'CO2[' + str(mol_CO2) + ']'
+            return 'CO2[' + str(mol_CO2) + ']&water[' + str(round(1 - mol_CO2, 3)) + ']'
+        # с примесями - нормированные доли, 4 значащие цифры (Ar ~1e-4 сохраняется),
+        # CO2 - остаток до 1
+        total = sum(mol.values())
+        other = [(name, float('%.4g' % (x / total))) for name, x in mol.items() if name != 'CO2']
+        mol_CO2 = round(1 - sum(x for _, x in other), 8)
+        return 'CO2[' + str(mol_CO2) + ']' + ''.join('&' + species[name][0] + '[' + str(x) + ']'
+                                                    for name, x in other)
 
-        # РАСЧЕТ К-АЛЬФА ПО ТЕПМЕРАТУРЕ ГОРЕНИЯ
-    def burnAlpha(self, temp_gas, temp_recyc): # расчет k_alpha
-        temp_gas = temp_gas - self.temp0
-        temp_recyc = temp_recyc - self.temp0
-    
-        resedual = lambda k_recyc: abs(self._burnTemp(k_recyc=k_recyc, 
-                temp_recyc=temp_recyc) - temp_gas)
-    
-        sol = root(resedual, 1)
-        return sol.x[0]
-    
         # РАСЧЕТ ЗАВИСИМОСТИ И ПОСТОРЕНИЕ ГРАФИКА
     def tempAlphaPl(self, k_recyc, temp_recyc):
         plt.figure(figsize=(5, 4))
         temp_recyc = temp_recyc - self.temp0        
         n = 50
-        ti = np.zeros(n)
         ki = np.linspace(k_recyc[0], k_recyc[1], n)
         
-        for i in range(n):
-            ti[i] = self._burnTemp(k_recyc=ki[i], temp_recyc=temp_recyc) + self.temp0
+        ti = self._burnTempArr(k_recyc=ki, temp_recyc=temp_recyc) + self.temp0
         
         plt.plot(ki, ti, color='red')
         plt.minorticks_on()
@@ -163,12 +338,15 @@ class Combust:
         plt.show()
 
 
-
-
-
-
-
-
-
-
-
+    # КАМЕРА СГОРАНИЯ ИЗ КЭША (топливо, окислитель, избыток O2)
+def combustor(fuel=None, oxidant=None, excess_O2=0.):
+    # один экземпляр на состав и поток - повторное использование без пересоздания
+    # burnArr и fluidMix(comp) не меняют состояние; после burnAlpha - reset()
+    combs = getattr(_cache, 'combs', None)
+    if combs is None:
+        combs = _cache.combs = {}
+    key = (tuple(sorted((fuel or {}).items())), tuple(sorted((oxidant or {}).items())),
+           float(excess_O2))
+    if key not in combs:
+        combs[key] = Combust(fuel, oxidant, excess_O2)
+    return combs[key]
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Aug 18 08:14:52 2024
+
+РАСЧЕТ ЦИКЛА АЛЛАМА БЕЗ СОСТОЯНИЯ
+
+solve_cycle(inputs) -> CycleResult
+    - входные данные - CycleInputs (давления, температуры, потери
+      давления, КПД, backend, таблица смеси, топливо и окислитель)
+    - результат - неизменяемый CycleResult: параметры в точках цикла
+      (структурированный массив (8,), только чтение) и параметры цикла
+    - общего изменяемого состояния нет - расчет можно вести параллельно
+      в потоках / процессах
+    - previous - предыдущий результат: пересчитываются только этапы,
+      зависящие от измененных входных данных (cycle_depends)
+    - solvers - обратные решатели T(p,s), T(p,h) с теплым стартом
+      (по умолчанию - новые на каждый расчет)
+
+solve_batch(inputs) -> (p, g) - те же этапы расчета для массивов режимов
+(смесь - группами одинакового состава)
+
+Acycle - обертка над solve_cycle и solve_batch
+
+cycle_frame - параметры в точках из результата в памяти или из файла
+CycleSink - запись результатов в один файл блоками (по запросу)
+
+Температура в К, давление в Pa
+"""
+
+import os
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from allam.combustion import combustor
+from allam.tempsolver import TempSolver
+from allam.envelope import dew_temperature
+from allam.fluidstate import fluid_state, mix_state
+
+cycle_columns = ('CO2', 'H2O', 'temp', 'dt', 'pres', 'dp_rel',
+                 'dens', 'entr', 'enth', 'dh', 'sp_heat', 'efc', 'phase')
+
+CycleInputs = namedtuple('CycleInputs', ['pressure_min', 'pressure_rate', 'temp_compr',
+                                         'temp_turb', 'temp_recyc', 'dp_rel', 'efc',
+                                         'backend', 'mix_table', 'fuel', 'oxidant', 'excess_O2'],
+                         defaults=((.98, np.nan, .95, .99, 1., .95, np.nan, .95), # относительные потери давления
+                                   (.99,  .9, .85, 1., 1., 1., .86, .85), # КПД
+                                   None, None, # backend (None - по умолчанию), таблица смеси
+                                   None, None, 0.)) # топливо (None - метан), окислитель (None - O2), избыток O2
+
+# зависимости этапов расчета: этап - (точки цикла, входные данные)
+cycle_depends = {
+    'pres': ((0, 1, 2, 3, 4, 5, 6, 7), {'pressure_min', 'pressure_rate', 'dp_rel'}),
+    'comb': ((), {'temp_turb', 'temp_recyc', 'fuel'}),
+    'compr': ((5, 6), {'pressure_min', 'pressure_rate', 'temp_compr', 'efc'}),
+    'heat': ((7,), {'pressure_min', 'pressure_rate', 'temp_recyc', 'dp_rel'}),
+    'turb': ((0, 1), {'pressure_min', 'pressure_rate', 'temp_turb', 'temp_recyc',
+                      'efc', 'dp_rel', 'fuel'}),
+    'recup': ((2, 3, 4), {'pressure_min', 'pressure_rate', 'temp_compr', 'temp_turb',
+                          'temp_recyc', 'efc', 'dp_rel', 'fuel'}),
+}
+
+_dp_rel_input = [0, 2, 3, 4, 5, 7] # заданные потери давления (1, 6 - расчетные)
+
+
+class CycleResult(namedtuple('CycleResult', ['inputs', 'p', 'k_recyc', 'mol_CO2',
+                                             'mass_CO2_recyc', 'pinch', 'work_cycle',
+                                             'efc_cycle', 'recomputed', 'fluid'])):
+    __slots__ = ()
+
+        # ПАРАМЕТРЫ В ТОЧКАХ ЦИКЛА - ТАБЛИЦА
+    def to_frame(self):
+        return pd.DataFrame(self.p, index=range(len(self.p)))
+
+        # ТОЧКА РОСЫ ПРОДУКТОВ СГОРАНИЯ ЗА РЕКУПЕРАТОРОМ (точка 2) - начало конденсации
+        # воды; temp[2] < temp_dew - конденсация начинается в горячей части рекуператора
+        # (рассчитывается по запросу: первый вызов для состава строит огибающую)
+    def temp_dew(self):
+        return float(dew_temperature(self.mol_CO2, self.p['pres'][2], fluid=self.fluid))
+
+        # ПАРАМЕТРЫ ЦИКЛА
+    def to_series(self):
+        return pd.Series({'k_recyc': self.k_recyc, 'pinch': self.pinch,
+                          'work_cycle': self.work_cycle, 'efc_cycle': self.efc_cycle})
+
+
+    # ОБРАТНЫЕ РЕШАТЕЛИ T(p,s), T(p,h) СМЕСИ (точки 1, 2)
+def cycle_solvers(mix_table=None):
+    solvers = {('S', 1): TempSolver(guess=500.),
+               ('H', 1): TempSolver(guess=1000.),
+               ('H', 2): TempSolver(guess=1000.)}
+    if mix_table is not None:
+        # корень вне диапазона таблицы - nan (без прижатия к краю вилки)
+        for solver in solvers.values():
+            solver.bounds = (mix_table.axes[0][0], mix_table.axes[0][-1])
+    return solvers
+
+
+    # СОСТОЯНИЕ СМЕСИ ПРОДУКТОВ СГОРАНИЯ: ТАБЛИЦА (CO2/H2O) ИЛИ COOLPROP
+def cycle_mix_state(mol_CO2, mix_table=None, fluid=None):
+    # fluid - строка CoolProp смеси (по умолчанию CO2/H2O по mol_CO2)
+    default = 'CO2[' + str(mol_CO2) + ']&water[' + str(round(1 - mol_CO2, 3)) + ']'
+    if mix_table is not None:
+        if fluid is not None and fluid != default:
+            raise ValueError('mix_table covers CO2/H2O only, got ' + fluid)
+        return mix_table.state(mol_CO2)
+    return mix_state(fluid or default)
+
+
+    # ИЗМЕНЕННЫЕ ВХОДНЫЕ ДАННЫЕ ОТНОСИТЕЛЬНО ПРЕДЫДУЩЕГО РАСЧЕТА
+def _changed(inputs, previous):
+    if previous is None or (previous.backend, previous.mix_table) != (inputs.backend, inputs.mix_table):
+        return set(inputs._fields)
+    changed = set()
+    for key in ('pressure_min', 'pressure_rate', 'temp_compr', 'temp_turb', 'temp_recyc', 'efc'):
+        if not np.array_equal(getattr(inputs, key), getattr(previous, key)):
+            changed.add(key)
+    if (inputs.fuel, inputs.oxidant, inputs.excess_O2) != (previous.fuel, previous.oxidant, previous.excess_O2):
+        changed.add('fuel')
+    dp_rel = np.asarray(inputs.dp_rel, dtype=float)[_dp_rel_input]
+    if not np.array_equal(dp_rel, np.asarray(previous.dp_rel, dtype=float)[_dp_rel_input]):
+        changed.add('dp_rel')
+    return changed
+
+
+    # СТОЛБЦЫ ПО ТОЧКАМ ЦИКЛА: p (8,) - значения, p (N, 8) - массивы режимов
+def _cols(p, *names):
+    return [p[name].T for name in names]
+
+
+def _point(p, point, state, cols=('enth', 'entr', 'dens', 'sp_heat', 'phase')):
+    for col in cols:
+        p[col].T[point] = getattr(state, col)
+
+
+def _value(x, digits=None):
+    # скаляр - float (как в одиночном расчете), массив - по элементам
+    x = np.asarray(x, dtype=float)
+    if digits is not None:
+        if x.ndim == 0:
+            return round(float(x), digits)
+        return np.array([round(v, digits) for v in x.tolist()])
+    return float(x) if x.ndim == 0 else x
+
+
+    # ДАВЛЕНИЕ В КОНТУРЕ
+def _stage_pres(p, inputs, ctx):
+    pres, dp_rel = _cols(p, 'pres', 'dp_rel')
+    pres[5] = inputs.pressure_min
+    pres[6] = pres[5] * inputs.pressure_rate
+    pres[7] = pres[6] * dp_rel[7]
+    pres[0] = pres[7] * dp_rel[0]
+    pres[4] = pres[5] / dp_rel[5]
+    pres[3] = pres[4] / dp_rel[4]
+    pres[2] = pres[3] / dp_rel[3]
+    pres[1] = pres[2] / dp_rel[2]
+    dp_rel[6] = pres[5] / pres[6]
+    dp_rel[1] = pres[0] / pres[1]
+
+
+    # ФРАКЦИОННЫЙ СОСТАВ РАБОЧЕГО ТЕЛА
+def _stage_comb(p, inputs, ctx):
+    comb = combustor(inputs.fuel, inputs.oxidant, inputs.excess_O2)
+    k_recyc, comp = comb.burnArr(temp_gas=inputs.temp_turb, temp_recyc=inputs.temp_recyc)
+    ctx['k_recyc'] = _value(k_recyc)
+    ctx['mol_CO2'] = _value(comp['mol_CO2'], 3)
+    ctx['mass_CO2_recyc'] = _value(comp['mass_CO2_recyc'])
+    ctx['fluid'] = comb.fluidMix(comp)[()]
+
+
+    # ТОЧКИ 5, 6 - КОМПРЕССОР [CO2]
+def _stage_compr(p, inputs, ctx):
+    co2 = fluid_state('CO2', backend=inputs.backend)
+    temp, pres, enth, entr, efc = _cols(p, 'temp', 'pres', 'enth', 'entr', 'efc')
+
+    # точка 5 - перед компрессором [CO2] (пик cp у критической точки - всегда HEOS)
+    _point(p, 5, fluid_state('CO2', backend='HEOS').tp(temp[5], pres[5]))
+
+    # точка 6 - за компрессором / адиабатическое сжатие [CO2]
+    enthalpy_isoentr_compr = co2.ps(pres[6], entr[5]).enth
+    dh_isoentr_compr = enthalpy_isoentr_compr - enth[5]
+    enth[6] = enth[5] + dh_isoentr_compr / efc[6]
+    state = co2.hp(enth[6], pres[6])
+    temp[6] = state.temp
+    _point(p, 6, state, ('entr', 'dens', 'sp_heat', 'phase'))
+
+
+    # ТОЧКА 7 - ЗА РЕКУПЕРАТОРОМ / ХОЛОДНАЯ ЧАСТЬ - НАГРЕВ [CO2]
+def _stage_heat(p, inputs, ctx):
+    co2 = fluid_state('CO2', backend=inputs.backend)
+    temp, pres = _cols(p, 'temp', 'pres')
+    _point(p, 7, co2.tp(temp[7], pres[7]))
+
+
+    # ТОЧКИ 0, 1 - ТУРБИНА [CO2,H2O]
+def _stage_turb(p, inputs, ctx):
+    mix, solvers = ctx['mix'], ctx['solvers']
+    temp, pres, enth, entr, efc = _cols(p, 'temp', 'pres', 'enth', 'entr', 'efc')
+    _point(p, 0, mix.tp(temp[0], pres[0]))
+
+    # точка 1 - за турбиной / адиабатическое расширение [CO2,H2O]
+    temp_isoentr_expand = solvers['S', 1].temp_s(pres[1], entr[0], mix)
+    enthalpy_isoentr_expand = mix.tp(temp_isoentr_expand, pres[1]).enth
+    dh_isoentr_expand = enthalpy_isoentr_expand - enth[0]
+    enth[1] = enth[0] + dh_isoentr_expand * efc[1]
+    temp[1] = solvers['H', 1].temp_h(pres[1], enth[1], mix)
+    _point(p, 1, mix.tp(temp[1], pres[1]), ('entr', 'dens', 'sp_heat', 'phase'))
+
+
+    # ТОЧКИ 2, 3, 4 - РЕКУПЕРАТОР (ГОРЯЧАЯ ЧАСТЬ), СЕПАРАТОР
+def _stage_recup(p, inputs, ctx):
+    co2 = fluid_state('CO2', backend=inputs.backend)
+    mix, solvers = ctx['mix'], ctx['solvers']
+    temp, pres, enth = _cols(p, 'temp', 'pres', 'enth')
+
+    # точка 2 - за рекуператором / горячая часть - охлаждение [CO2,H2O]
+    enth[2] = enth[1] - ctx['mass_CO2_recyc'] * (enth[7] - enth[6])
+    temp[2] = solvers['H', 2].temp_h(pres[2], enth[2], mix)
+    _point(p, 2, mix.tp(temp[2], pres[2]), ('entr', 'dens', 'sp_heat', 'phase'))
+
+    # точки 3, 4 - за сепаратором / осушение [CO2]
+    temp[3:5] = temp[2]
+    state = co2.tp(temp[3], pres[3])
+    _point(p, 3, state)
+    _point(p, 4, state)
+
+
+    # СОСТАВ ПО ТОЧКАМ, ПЕРЕПАДЫ, ПАРАМЕТРЫ ЦИКЛА: (пинч, работа, эффективность)
+def _stage_total(p, ctx):
+    co2, h2o, temp, enth, dt, dh = _cols(p, 'CO2', 'H2O', 'temp', 'enth', 'dt', 'dh')
+    mol_CO2, mass_CO2_recyc = ctx['mol_CO2'], ctx['mass_CO2_recyc']
+    co2[0:3] = mol_CO2
+    h2o[0:3] = 1 - mol_CO2
+    co2[3:8] = 1
+    h2o[3:8] = 0
+
+    # перепады температур и энтальпий
+    dt[:] = temp - np.roll(temp, 1, axis=0) # dt[0] = temp[0] - temp[7]
+    dh[:] = enth - np.roll(enth, 1, axis=0) # dh[0] - перепад энтальпий в охладителе
+    dh[2] = - mass_CO2_recyc * dh[7]
+
+    # пинч-поинт, полезная работа цикла, эффективность
+    pinch = temp[1] - temp[7]
+    work_cycle = np.abs(dh[1] - dh[6] * mass_CO2_recyc)
+    return pinch, work_cycle, work_cycle / dh[0]
+
+
+cycle_stages = {'pres': _stage_pres, 'comb': _stage_comb, 'compr': _stage_compr,
+                'heat': _stage_heat, 'turb': _stage_turb, 'recup': _stage_recup}
+
+
+    # ВХОДНЫЕ ДАННЫЕ В ТОЧКАХ ЦИКЛА
+def _inputs_to_points(p, inputs):
+    temp = p['temp'].T
+    temp[5] = inputs.temp_compr # температура перед компрессором
+    temp[0] = inputs.temp_turb # температура перед турбиной
+    temp[7] = inputs.temp_recyc # температура СО2 перед камерой сгорания
+    p['dp_rel'][..., _dp_rel_input] = np.asarray(inputs.dp_rel, dtype=float)[_dp_rel_input]
+    p['efc'] = inputs.efc
+
+
+    # РАСЧЕТ ПАРАМЕТРОВ РТ В ТОЧКАХ ЦИКЛА
+def solve_cycle(inputs, previous=None, solvers=None):
+    if previous is None:
+        p = np.zeros(8, dtype=[(col, float) for col in cycle_columns])
+        ctx = {}
+    else:
+        p = previous.p.copy()
+        ctx = {'k_recyc': previous.k_recyc, 'mol_CO2': previous.mol_CO2,
+               'mass_CO2_recyc': previous.mass_CO2_recyc, 'fluid': previous.fluid}
+    changed = _changed(inputs, None if previous is None else previous.inputs)
+
+    _inputs_to_points(p, inputs)
+    ctx['solvers'] = cycle_solvers(inputs.mix_table) if solvers is None else solvers
+
+    # пересчет только этапов, зависящих от измененных входных данных
+    recomputed = set()
+    for stage, (points, depends) in cycle_depends.items():
+        if changed & depends:
+            if stage in ('turb', 'recup') and 'mix' not in ctx:
+                ctx['mix'] = cycle_mix_state(ctx['mol_CO2'], inputs.mix_table, ctx['fluid'])
+            cycle_stages[stage](p, inputs, ctx)
+            recomputed.update(points)
+
+    pinch, work_cycle, efc_cycle = _stage_total(p, ctx)
+    p.flags.writeable = False
+
+    return CycleResult(inputs, p, ctx['k_recyc'], ctx['mol_CO2'], ctx['mass_CO2_recyc'],
+                       float(pinch), float(work_cycle), float(efc_cycle), tuple(sorted(recomputed)),
+                       ctx['fluid'])
+
+
+    # ПАКЕТНЫЙ РАСЧЕТ: ВХОДНЫЕ ДАННЫЕ - МАССИВЫ (N,), ТЕ ЖЕ ЭТАПЫ, ЧТО В solve_cycle
+def solve_batch(inputs, solvers=None, dew=False):
+    # inputs - CycleInputs: pressure_min, pressure_rate, temp_* - массивы одинаковой
+    # длины (или скаляры), efc - по точкам (8,) или по режимам (N, 8)
+    # dew - добавить в g точку росы за рекуператором temp_dew
+    # возвращает p - (N, 8) и g - (N,) структурированные массивы
+    keys = ('pressure_min', 'pressure_rate', 'temp_compr', 'temp_turb', 'temp_recyc')
+    values = np.broadcast_arrays(*[np.atleast_1d(np.asarray(getattr(inputs, key), dtype=float))
+                                   for key in keys])
+    inputs = inputs._replace(**dict(zip(keys, values)))
+    n = values[0].size
+
+    p = np.zeros((n, 8), dtype=[(col, float) for col in cycle_columns])
+    g = np.zeros(n, dtype=[(col, float) for col in ('k_recyc', 'pinch', 'work_cycle', 'efc_cycle')
+                           + (('temp_dew',) if dew else ())])
+    _inputs_to_points(p, inputs)
+    ctx = {'solvers': cycle_solvers(inputs.mix_table) if solvers is None else solvers}
+    for stage in ('pres', 'comb', 'compr', 'heat'):
+        cycle_stages[stage](p, inputs, ctx)
+    ctx['fluid'] = np.atleast_1d(ctx['fluid']).astype(str)
+
+    # точки 0-4 - группами одинакового состава смеси
+    comp, inverse = np.unique(ctx['fluid'], return_inverse=True)
+    for j, fluid in enumerate(comp):
+        idx = np.flatnonzero(inverse == j)
+        sub, mol_CO2 = p[idx], ctx['mol_CO2'][idx[0]]
+        sub_ctx = dict(ctx, mix=cycle_mix_state(mol_CO2, inputs.mix_table, fluid),
+                       mass_CO2_recyc=ctx['mass_CO2_recyc'][idx])
+        cycle_stages['turb'](sub, inputs, sub_ctx)
+        cycle_stages['recup'](sub, inputs, sub_ctx)
+        p[idx] = sub
+        if dew:
+            # точка росы за рекуператором (начало конденсации воды)
+            g['temp_dew'][idx] = dew_temperature(mol_CO2, sub['pres'][:, 2], fluid=fluid)
+
+    g['k_recyc'] = ctx['k_recyc']
+    g['pinch'], g['work_cycle'], g['efc_cycle'] = _stage_total(p, ctx)
+    return p, g
+
+
+    # ПАРАМЕТРЫ В ТОЧКАХ ЦИКЛА: Acycle, CycleResult, DataFrame или файл .csv
+def cycle_frame(cycle='cycle.csv'):
+    if isinstance(cycle, str):
+        return pd.read_csv(cycle)
+    if isinstance(cycle, CycleResult):
+        return cycle.to_frame()
+    if isinstance(cycle, pd.DataFrame):
+        return cycle
+    return cycle.p
+
+
+class CycleSink:
+    '''
+    ЗАПИСЬ РЕЗУЛЬТАТОВ В ОДИН ФАЙЛ (по запросу)
+
+    Одна строка на режим: параметры цикла + параметры в точках
+    (столбцы temp_0 ... temp_7 и т.д.). Строки накапливаются в памяти
+    и дописываются в файл блоками по buffer строк.
+    '''
+    def __init__(self, path='cycles.csv', buffer=10000):
+        self.path = path
+        self.buffer = buffer
+        self._rows = []
+        self._size = 0
+
+        # ДОБАВЛЕНИЕ: CycleResult или (p, g) из Acycle.cycle_batch
+    def append(self, result):
+        if isinstance(result, CycleResult):
+            p = result.p[None]
+            g = {key: [value] for key, value in result.to_series().items()}
+        else:
+            p, g = result
+            g = {key: g[key] for key in g.dtype.names}
+
+        row = pd.DataFrame(g)
+        wide = {col + '_' + str(i): p[col][:, i] for col in cycle_columns
+                for i in range(p.shape[1])}
+        row = pd.concat([row, pd.DataFrame(wide)], axis=1)
+        self._rows.append(row)
+        self._size += len(row)
+        if self._size >= self.buffer:
+            self.flush()
+
+        # ДОЗАПИСЬ НАКОПЛЕННЫХ СТРОК В ФАЙЛ
+    def flush(self):
+        if not self._rows:
+            return
+        data = pd.concat(self._rows, ignore_index=True)
+        header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        data.to_csv(self.path, mode='a', header=header, index=False)
+        self._rows = []
+        self._size = 0
+
+    def read(self):
+        self.flush()
+        return pd.read_csv(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
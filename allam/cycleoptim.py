@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Sep  1 10:05:37 2024
+
+ОПТИМИЗАЦИЯ ПАРАМЕТРОВ ЦИКЛА
+
+cycle_optim - максимум efc_cycle по любым входным данным cycle():
+    pressure_min, pressure_rate, temp_compr, temp_turb, temp_recyc
+    - ограничения: минимальный напор внутри рекуператора (recup_profile)
+      не меньше pinch_min; на входе компрессора (точка 5) - жидкость или
+      сверхкритическое состояние (давление выше насыщения / критического)
+    - SLSQP, градиент - конечные разности: точка и смещения по всем
+      переменным считаются одним блоком (параллельно в процессах, n_jobs)
+    - результаты расчета точек кэшируются (повторные обращения
+      оптимизатора к той же точке не пересчитываются)
+
+Температура в К, давление в Pa
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.optimize import minimize
+from allam.sweep import sweep_inputs
+from allam.fluidstate import default_backend
+from allam.saturation import fluid_constants, sat_pressure
+from allam.cyclecore import CycleInputs, solve_cycle, cycle_solvers
+from allam.recuperator import recup_profile
+
+OptimResult = namedtuple('OptimResult', ['x', 'efc_cycle', 'pinch', 'result', 'n_eval',
+                                         'success', 'message'])
+
+
+    # ДАВЛЕНИЕ - ГРАНИЦА ЖИДКОСТИ / СВЕРХКРИТИЧЕСКОГО СОСТОЯНИЯ НА ВХОДЕ КОМПРЕССОРА
+def compr_pressure_limit(temp_compr):
+    co2 = fluid_constants('CO2')
+    if temp_compr >= co2.temp_crit:
+        return co2.pres_crit
+    return float(sat_pressure(temp_compr, 'CO2'))
+
+
+    # РАСЧЕТ ОДНОЙ ТОЧКИ: (efc_cycle, пинч, запас по давлению на входе компрессора)
+def _optim_point(args):
+    values, kw, n = args
+    inputs = CycleInputs(**dict(zip(sweep_inputs, values)), **kw)
+    margin = inputs.pressure_min / compr_pressure_limit(inputs.temp_compr) - 1
+    try:
+        result = solve_cycle(inputs, solvers=cycle_solvers(inputs.mix_table))
+        pinch = recup_profile(result.p, n=n, mix_table=inputs.mix_table, fluid=result.fluid).pinch
+    except ValueError:
+        return np.nan, np.nan, margin
+    return result.efc_cycle, pinch, margin
+
+
+class _Evaluator:
+    '''
+    КЭШ РАСЧЕТОВ ТОЧЕК И БЛОЧНЫЙ (ПАРАЛЛЕЛЬНЫЙ) РАСЧЕТ
+    '''
+    def __init__(self, to_values, kw, n, pool):
+        self.to_values = to_values # нормированные переменные -> входные данные
+        self.kw = kw
+        self.n = n
+        self.pool = pool
+        self.cache = {}
+
+    def evaluate(self, points):
+        keys = [tuple(np.round(x, 12)) for x in points]
+        new = list(dict.fromkeys(key for key in keys if key not in self.cache))
+        args = [(self.to_values(np.array(key)), self.kw, self.n) for key in new]
+        if self.pool is None or len(args) < 2:
+            res = [_optim_point(arg) for arg in args]
+        else:
+            res = list(self.pool.map(_optim_point, args))
+        self.cache.update(zip(new, res))
+        return [self.cache[key] for key in keys]
+
+    def __call__(self, x):
+        efc, pinch, margin = self.evaluate([x])[0]
+        if not np.isfinite(efc):
+            # неудачный расчет свойств - заведомо плохая точка
+            return 0., -100., margin
+        return efc, pinch, margin
+
+        # КОНЕЧНЫЕ РАЗНОСТИ: ТОЧКА И СМЕЩЕНИЯ - ОДНИМ БЛОКОМ
+    def jac(self, x, step):
+        points = [x] + [x + step * e for e in np.eye(len(x))]
+        self.evaluate(points)
+        base = np.array(self(x))
+        return np.array([(np.array(self(p)) - base) / step for p in points[1:]]).T
+
+
+    # ОПТИМИЗАЦИЯ
+def cycle_optim(bounds, fixed=None, pinch_min=10., x0=None, dp_rel=None, efc=None,
+                backend=None, mix_table=None, fuel=None, oxidant=None, excess_O2=0.,
+                n=100, n_jobs=1, step=1e-4, maxiter=100, ftol=1e-9):
+    # bounds - {вход: (мин, макс)} - оптимизируемые переменные
+    # fixed - {вход: значение} - остальные входные данные
+    # pinch_min - минимальный напор внутри рекуператора [K]
+    # x0 - {вход: значение} начальное приближение (по умолчанию - середина bounds)
+    # n - число участков рекуператора (равномерная сетка - гладкий пинч)
+    # n_jobs - число процессов для блоков конечных разностей (1 - без пула)
+    # step - шаг конечных разностей в долях диапазона bounds
+    fixed = dict(fixed or {})
+    for key in list(bounds) + list(fixed):
+        if key not in sweep_inputs:
+            raise ValueError('unknown cycle input: ' + str(key))
+    missing = [key for key in sweep_inputs if key not in bounds and key not in fixed]
+    if missing:
+        raise ValueError('cycle inputs are not set: ' + ', '.join(missing))
+
+    names = list(bounds)
+    lo = np.array([bounds[key][0] for key in names], dtype=float)
+    hi = np.array([bounds[key][1] for key in names], dtype=float)
+
+    def to_values(x):
+        var = dict(zip(names, lo + np.asarray(x) * (hi - lo)))
+        return [var[key] if key in var else float(fixed[key]) for key in sweep_inputs]
+
+    kw = {'backend': backend or default_backend(), 'mix_table': mix_table,
+          'fuel': fuel, 'oxidant': oxidant, 'excess_O2': excess_O2}
+    if dp_rel is not None:
+        kw['dp_rel'] = tuple(dp_rel)
+    if efc is not None:
+        kw['efc'] = tuple(efc)
+
+    start = np.full(len(names), 0.5)
+    if x0 is not None:
+        start = np.array([(x0[key] - lo[i]) / (hi[i] - lo[i]) if key in x0 else 0.5
+                          for i, key in enumerate(names)])
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=min(n_jobs, len(names) + 1)) if n_jobs > 1 else None
+    try:
+        ev = _Evaluator(to_values, kw, n, pool)
+        constraints = [{'type': 'ineq', 'fun': lambda x: ev(x)[1] - pinch_min,
+                        'jac': lambda x: ev.jac(x, step)[1]},
+                       {'type': 'ineq', 'fun': lambda x: ev(x)[2],
+                        'jac': lambda x: ev.jac(x, step)[2]}]
+        res = minimize(lambda x: -ev(x)[0], start, jac=lambda x: -ev.jac(x, step)[0],
+                       method='SLSQP', bounds=[(0., 1.)] * len(names), constraints=constraints,
+                       options={'maxiter': maxiter, 'ftol': ftol})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    values = [float(v) for v in to_values(res.x)]
+    inputs = CycleInputs(**dict(zip(sweep_inputs, values)), **kw)
+    result = solve_cycle(inputs)
+    pinch = recup_profile(result.p, n=n, mix_table=mix_table, fluid=result.fluid).pinch
+    return OptimResult(x=dict(zip(sweep_inputs, values)), efc_cycle=result.efc_cycle, pinch=pinch,
+                       result=result, n_eval=len(ev.cache), success=bool(res.success),
+                       message=res.message)
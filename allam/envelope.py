@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Sep  9 09:27:44 2024
+
+ФАЗОВАЯ ОГИБАЮЩАЯ СМЕСИ CO2/H2O
+
+phase_envelope - линии точек росы (начало конденсации воды) и кипения
+смеси заданного состава по сетке давлений (HEOS, PQ):
+    - продолжение по давлению: каждая точка - с теплым стартом от
+      предыдущей (T, плотности и составы фаз, update_with_guesses)
+    - при неудаче шаг по давлению делится пополам (до max_split раз),
+      затем ветвь обрывается (линия кипения CO2/H2O не доходит
+      до критической области)
+    - огибающие хранятся по составу в памяти процесса (на диск
+      не записываются)
+dew_temperature - температура точки росы по давлению (интерполяция
+ln P по линии росы, PCHIP); для смеси с другими веществами (N2, O2, Ar) - nan
+
+Температура в К, давление в Pa
+"""
+
+import threading
+from collections import namedtuple
+import numpy as np
+import CoolProp as CP
+from scipy.interpolate import PchipInterpolator
+
+Envelope = namedtuple('Envelope', ['mol_CO2', 'pres_dew', 'temp_dew', 'pres_bubble', 'temp_bubble',
+                                   'n_calls'])
+
+_envelopes = {}
+_dew = {} # интерполяция линии росы по ключу огибающей
+_lock = threading.Lock()
+
+
+    # ОДНА ВЕТВЬ (quality = 1 - роса, 0 - кипение): ПРОДОЛЖЕНИЕ ПО ДАВЛЕНИЮ
+def _trace(state, quality, pressure, max_split=4):
+    temp = np.full(len(pressure), np.nan)
+    guess = None
+    n_calls = 0
+
+    def flash(pres):
+        nonlocal guess, n_calls
+        n_calls += 1
+        if guess is None:
+            state.update(CP.PQ_INPUTS, pres, quality)
+        else:
+            state.update_with_guesses(CP.PQ_INPUTS, pres, quality, guess)
+        # теплый старт следующей точки
+        guess = CP.CoolProp.PyGuessesStructure()
+        guess.T = state.T()
+        guess.rhomolar_liq = state.saturated_liquid_keyed_output(CP.iDmolar)
+        guess.rhomolar_vap = state.saturated_vapor_keyed_output(CP.iDmolar)
+        guess.x = list(state.mole_fractions_liquid())
+        guess.y = list(state.mole_fractions_vapor())
+        return guess.T
+
+    for i, pres in enumerate(pressure):
+        if guess is None:
+            # начало ветви - без начального приближения
+            try:
+                temp[i] = flash(pres)
+            except ValueError:
+                continue
+            continue
+        # шаг от последней точки; при неудаче - промежуточные давления
+        start, stack, split = pressure[i - 1], [pres], 0
+        while stack:
+            try:
+                flash(stack[-1])
+                start = stack.pop()
+            except ValueError:
+                split += 1
+                if split > max_split:
+                    return temp, n_calls
+                stack.append((start * stack[-1])**.5)
+        temp[i] = guess.T
+    return temp, n_calls
+
+
+    # РАСЧЕТ ОГИБАЮЩЕЙ
+def _build(mol_CO2, pressure, n):
+    state = CP.AbstractState('HEOS', 'CO2&Water')
+    state.set_mole_fractions([mol_CO2, 1 - mol_CO2])
+    pres = np.geomspace(pressure[0], pressure[1], n)
+    temp_dew, calls_dew = _trace(state, 1, pres)
+    temp_bubble, calls_bubble = _trace(state, 0, pres)
+    return Envelope(mol_CO2, pres, temp_dew, pres.copy(), temp_bubble, calls_dew + calls_bubble)
+
+
+    # ОГИБАЮЩАЯ ИЗ КЭША (память процесса)
+def phase_envelope(mol_CO2, pressure=(1e5, 3e7), n=60):
+    # mol_CO2 - мольная доля CO2 (остальное - вода), округляется до 1e-4
+    mol_CO2 = round(float(mol_CO2), 4)
+    key = (mol_CO2, tuple(pressure), n)
+    env = _envelopes.get(key)
+    if env is not None:
+        return env
+    with _lock:
+        if key not in _envelopes:
+            env = _build(mol_CO2, pressure, n)
+            for col in env[1:-1]:
+                col.flags.writeable = False
+            _envelopes[key] = env
+    return _envelopes[key]
+
+
+    # СМЕСЬ ТОЛЬКО ИЗ CO2 И ВОДЫ (строка CoolProp)
+def _binary(fluid):
+    return {part.split('[')[0] for part in fluid.split('&')} <= {'CO2', 'water', 'Water'}
+
+
+    # ТЕМПЕРАТУРА ТОЧКИ РОСЫ (вне рассчитанной линии - nan)
+def dew_temperature(mol_CO2, pressure, pressure_range=(1e5, 3e7), n=60, fluid=None):
+    # fluid - строка CoolProp смеси; с другими веществами огибающая CO2/H2O
+    # неприменима - nan
+    if fluid is not None and not _binary(fluid):
+        return np.full(np.shape(pressure), np.nan)[()]
+    key = (round(float(mol_CO2), 4), tuple(pressure_range), n)
+    interp = _dew.get(key)
+    if interp is None:
+        env = phase_envelope(mol_CO2, pressure=pressure_range, n=n)
+        ok = np.isfinite(env.temp_dew)
+        if ok.sum() < 2:
+            interp = lambda log_pres: np.full(np.shape(log_pres), np.nan)
+        else:
+            interp = PchipInterpolator(np.log(env.pres_dew[ok]), env.temp_dew[ok],
+                                       extrapolate=False)
+        _dew[key] = interp
+    return interp(np.log(np.asarray(pressure, dtype=float)))[()]
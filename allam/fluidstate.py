@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Aug  3 08:40:17 2024
+
+СОСТОЯНИЕ РАБОЧЕГО ТЕЛА
+
+Общий слой расчета свойств через CoolProp.AbstractState:
+    - объекты AbstractState создаются один раз на (backend, состав, фаза)
+      и хранятся в кэше (отдельно для каждого потока)
+    - один расчет состояния (update) возвращает сразу h, s, rho, cp и фазу
+
+Вход - строка CoolProp: 'CO2', 'CO2[0.95]&water[0.05]'
+phase='supercritical' - аналог 'T|supercritical' в PropsSI
+
+backend - источник свойств (интерфейс и единицы одинаковые):
+    - 'HEOS' - CoolProp, уравнение состояния
+    - 'BICUBIC&HEOS', 'TTSE&HEOS' - табличный CoolProp (см. tabular)
+    - 'pyfluids' - pyfluids (чистые вещества)
+    - 'grid' - предрасчитанная сетка (T, P) чистого вещества (FluidTable)
+    - None - backend по умолчанию: set_backend() или переменная
+      окружения ALLAM_BACKEND (иначе 'HEOS')
+
+property_cache - общий LRU-кэш результатов расчета состояния по ключу
+(backend, состав, фаза, пара входных параметров, округленные значения)
+
+Температура в К, давление в Pa
+"""
+
+import os
+import re
+import threading
+from collections import namedtuple, OrderedDict
+import numpy as np
+import CoolProp as CP
+
+State = namedtuple('State', ['temp', 'pres', 'enth', 'entr', 'dens', 'sp_heat', 'phase'])
+
+_cache = threading.local()
+
+_default_backend = os.environ.get('ALLAM_BACKEND', 'HEOS')
+
+
+    # BACKEND ПО УМОЛЧАНИЮ (для вызовов без backend)
+def set_backend(backend='HEOS'):
+    global _default_backend
+    _default_backend = backend
+
+
+def default_backend():
+    return _default_backend
+
+
+class PropertyCache:
+    def __init__(self, maxsize=100000, digits=10, enabled=True):
+        self.maxsize = maxsize # число хранимых состояний
+        self.digits = digits # значащие цифры округления входных параметров
+        self.enabled = enabled
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, fluid, pair, value1, value2):
+        return fluid + (pair, float('%.*g' % (self.digits, value1)),
+                        float('%.*g' % (self.digits, value2)))
+
+    def get(self, key):
+        with self._lock:
+            state = self._data.get(key)
+            if state is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return state
+
+    def put(self, key, state):
+        with self._lock:
+            self._data[key] = state
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data),
+                'maxsize': self.maxsize, 'enabled': self.enabled}
+
+
+property_cache = PropertyCache()
+
+
+class FluidState:
+    def __init__(self, fluid, backend='HEOS', phase=None):
+        self.fluid = fluid
+        self.backend = backend
+        self.phase = phase
+
+        comp = re.findall(r'([^&\[\]]+)\[([^\]]+)\]', fluid)
+        if comp:
+            self.components = [c[0] for c in comp]
+            self.fractions = [float(c[1]) for c in comp]
+        else:
+            self.components = fluid.split('&')
+            self.fractions = [1. / len(self.components)] * len(self.components)
+
+        if backend in ('pyfluids', 'grid'):
+            if len(self.components) > 1:
+                raise ValueError(backend + ' backend supports pure fluids only: ' + fluid)
+            if backend == 'pyfluids':
+                self.state = PyfluidsState(fluid)
+            else:
+                from allam.tabular import FluidTable
+                self.state = FluidTable.cached(fluid).state()
+            # фаза определяется по состоянию (phase не задается)
+            return
+
+        self.state = CP.AbstractState(backend, '&'.join(self.components))
+        if len(self.components) > 1:
+            self.state.set_mole_fractions(self.fractions)
+        if phase is not None:
+            self.state.specify_phase(getattr(CP, 'iphase_' + phase))
+
+    def keyed(self, key):
+        return self.state.keyed_output(key)
+
+        # ОДИН РАСЧЕТ СОСТОЯНИЯ - ВСЕ СВОЙСТВА
+    def _update(self, pair, value1, value2):
+        cache = property_cache
+        if cache.enabled:
+            key = cache.key((self.backend, self.fluid, self.phase), pair, value1, value2)
+            state = cache.get(key)
+            if state is not None:
+                return state
+
+        st = self.state
+        st.update(pair, value1, value2)
+        state = State(st.T(), st.p(), st.hmass(), st.smass(), st.rhomass(),
+                      st.cpmass(), float(st.phase()))
+        if cache.enabled:
+            cache.put(key, state)
+        return state
+
+    def _flash(self, pair, value1, value2):
+        if np.ndim(value1) == 0 and np.ndim(value2) == 0:
+            return self._update(pair, value1, value2)
+
+        # массив точек - неудачный расчет дает nan (как inf в PropsSI)
+        value1, value2 = np.broadcast_arrays(np.asarray(value1, dtype=float),
+                                             np.asarray(value2, dtype=float))
+        out = np.full((len(State._fields),) + value1.shape, np.nan)
+        for i in np.ndindex(value1.shape):
+            try:
+                out[(slice(None),) + i] = self._update(pair, value1[i], value2[i])
+            except ValueError:
+                pass
+        return State(*out)
+
+    def tp(self, temp, pressure):
+        return self._flash(CP.PT_INPUTS, pressure, temp)
+
+    def hp(self, enthalpy, pressure):
+        return self._flash(CP.HmassP_INPUTS, enthalpy, pressure)
+
+    def ps(self, pressure, entropy):
+        return self._flash(CP.PSmass_INPUTS, pressure, entropy)
+
+    def qt(self, quality, temp):
+        return self._flash(CP.QT_INPUTS, quality, temp)
+
+
+class PyfluidsState:
+    '''
+    СОСТОЯНИЕ PYFLUIDS С ИНТЕРФЕЙСОМ AbstractState (единицы SI, К)
+
+    pyfluids - °C и степень сухости в %, пересчет на входе и выходе.
+    Константы вещества (keyed_output) - из CoolProp HEOS (то же уравнение
+    состояния).
+    '''
+    _inputs = {CP.PT_INPUTS: ('pressure', 'temperature'),
+               CP.HmassP_INPUTS: ('enthalpy', 'pressure'),
+               CP.PSmass_INPUTS: ('pressure', 'entropy'),
+               CP.QT_INPUTS: ('quality', 'temperature')}
+    _phases = {'Liquid': 'liquid', 'Supercritical': 'supercritical',
+               'SupercriticalGas': 'supercritical_gas', 'SupercriticalLiquid': 'supercritical_liquid',
+               'CriticalPoint': 'critical_point', 'Gas': 'gas', 'TwoPhase': 'twophase',
+               'Unknown': 'unknown', 'NotImposed': 'not_imposed'}
+
+    def __init__(self, fluid):
+        from pyfluids import Fluid, FluidsList, Input
+
+        self.Input = Input
+        self.heos = CP.AbstractState('HEOS', fluid)
+        name = self.heos.name()
+        for item in FluidsList:
+            if item.coolprop_name == name:
+                self.fluid = Fluid(item)
+                break
+        else:
+            raise ValueError('pyfluids: unknown fluid ' + fluid)
+
+    def keyed_output(self, key):
+        return self.heos.keyed_output(key)
+
+    def update(self, pair, value1, value2):
+        if pair not in self._inputs:
+            raise ValueError('pyfluids: unsupported input pair ' + str(pair))
+        inputs = []
+        for name, value in zip(self._inputs[pair], (value1, value2)):
+            if name == 'temperature':
+                value = value - 273.15
+            elif name == 'quality':
+                value = value * 100
+            inputs.append(getattr(self.Input, name)(value))
+        self.fluid.update(*inputs)
+
+    def T(self):
+        return self.fluid.temperature + 273.15
+
+    def p(self):
+        return self.fluid.pressure
+
+    def hmass(self):
+        return self.fluid.enthalpy
+
+    def smass(self):
+        return self.fluid.entropy
+
+    def rhomass(self):
+        return self.fluid.density
+
+    def cpmass(self):
+        return self.fluid.specific_heat
+
+    def phase(self):
+        return getattr(CP, 'iphase_' + self._phases[self.fluid.phase.name])
+
+
+    # СОСТОЯНИЕ ИЗ КЭША (backend, состав, фаза)
+def fluid_state(fluid, backend=None, phase=None):
+    backend = backend or _default_backend
+    states = getattr(_cache, 'states', None)
+    if states is None:
+        states = _cache.states = {}
+    key = (backend, fluid, phase)
+    if key not in states:
+        states[key] = FluidState(fluid, backend=backend, phase=phase)
+    return states[key]
+
+
+def mix_state(fluid, backend='HEOS'):
+    # смесь CO2/H2O считается как сверхкритическая фаза
+    # (смеси - только CoolProp, табличная смесь - MixTable)
+    return fluid_state(fluid, backend=backend, phase='supercritical')
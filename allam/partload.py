@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Sep  7 09:41:18 2024
+
+РАСЧЕТ ЦИКЛА НА ЧАСТИЧНОЙ НАГРУЗКЕ
+
+PartLoad - характеристики машин по расчетному режиму Acycle (power):
+    - турбина - закон Стодолы: m * T0^0.5 / (p0^2 - p1^2)^0.5 = const,
+      КПД ~ 1 - turb * (m / m_р - 1)^2
+    - компрессор - характеристика при постоянной частоте вращения по
+      объемному расходу на входе phi = G / rho5 (относительно расчетного;
+      rho5 - HEOS, вблизи критической точки идеальный газ неприменим):
+      pressure_rate ~ 1 + compr[0] * (1 - phi^2), КПД ~ 1 - compr[1] * (phi - 1)^2
+    - режим допустим, если давление перед компрессором выше давления
+      насыщения (критического) при T5: запас margin > 0, признак feasible
+    - температуры перед турбиной, компрессором и рециркулируемого CO2 -
+      постоянные (регулирование)
+    - на режиме мощности решаются расход и давление перед компрессором
+      (метод Ньютона, точка и смещения для производных - один пакетный
+      расчет Acycle.cycle_batch), теплый старт с предыдущего режима
+
+curve - характеристика по ряду нагрузок (продолжение по нагрузке)
+dispatch - график нагрузки любой длины: характеристика в узлах по
+диапазону нагрузок, режимы графика - пакетный расчет с теплым стартом от
+узлов (интерполяция PCHIP) и уточнением методом Ньютона
+
+Температура в К, давление в Pa, мощность в кВт
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import PchipInterpolator
+from allam.fluidstate import fluid_state
+from allam.cycleoptim import compr_pressure_limit
+
+partload_columns = ('power', 'load', 'mfr', 'pressure_min', 'pressure_rate', 'efc_turb',
+                    'efc_compr', 'temp_turb_out', 'work_cycle', 'efc_cycle', 'margin')
+
+
+class PartLoad:
+    def __init__(self, sco, power, compr=(0.3, 0.5), turb=0.3):
+        # sco - Acycle, рассчитанный на расчетном режиме (cycle)
+        # power - расчетная мощность [кВт]
+        # compr - коэффициенты характеристики компрессора (степень сжатия, КПД)
+        # turb - коэффициент снижения КПД турбины
+        from allam.allam import Acycle
+
+        # sco не изменяется: расчетный расход - по результату cycle
+        design = sco.result
+        self.design = design
+        self.power_design = power
+        self.compr = compr
+        self.turb = turb
+
+        inputs = design.inputs
+        self.temperature = (inputs.temp_compr, inputs.temp_turb, inputs.temp_recyc)
+        self.pressure_min = inputs.pressure_min
+        self.pressure_rate = inputs.pressure_rate
+        self.efc = np.asarray(inputs.efc, dtype=float)
+        self.mfr = power * 1000. / design.work_cycle # расход через турбину [кг/с]
+
+        # вход компрессора: плотность на расчетном режиме, нижняя граница давления
+        self.co2 = fluid_state('CO2', backend='HEOS')
+        self.dens_compr = design.p['dens'][5]
+        self.pressure_limit = compr_pressure_limit(inputs.temp_compr)
+
+        # постоянная Стодолы турбины
+        p0, p1 = design.p['pres'][0], design.p['pres'][1]
+        self.stodola = self.mfr * inputs.temp_turb**.5 / (p0**2 - p1**2)**.5
+
+        # расчет режимов - отдельный Acycle с теми же настройками
+        self.sco = Acycle(backend=sco.backend, mix_table=sco.mix_table, fuel=sco.fuel,
+                          oxidant=sco.oxidant, excess_O2=sco.excess_O2)
+        self.sco.p['dp_rel'] = inputs.dp_rel
+
+        # РЕЖИМ МАШИН ПО ОТНОСИТЕЛЬНЫМ РАСХОДУ И ДАВЛЕНИЮ ПЕРЕД КОМПРЕССОРОМ
+    def _machines(self, x):
+        # x - (N, 2): расход, давление перед компрессором (доли расчетных)
+        mass, pres = x[:, 0], x[:, 1]
+        # объемный расход на входе компрессора (T5 - постоянная)
+        dens = np.asarray(self.co2.tp(np.full(len(x), self.temperature[0]),
+                                      pres * self.pressure_min).dens, dtype=float)
+        phi = mass * self.dens_compr / dens
+        pressure_rate = self.pressure_rate * (1 + self.compr[0] * (1 - phi**2))
+        efc = np.tile(self.efc, (len(x), 1))
+        efc[:, 6] = self.efc[6] * (1 - self.compr[1] * (phi - 1)**2)
+        efc[:, 1] = self.efc[1] * (1 - self.turb * (mass - 1)**2)
+        return pres * self.pressure_min, pressure_rate, efc
+
+        # НЕВЯЗКИ: ЗАКОН СТОДОЛЫ, МОЩНОСТЬ
+    def _residual(self, x, power):
+        pressure_min, pressure_rate, efc = self._machines(x)
+        p, g = self.sco.cycle_batch(pressure_min, pressure_rate, self.temperature, efc=efc)
+        mfr = x[:, 0] * self.mfr
+        p0, p1 = p['pres'][:, 0], p['pres'][:, 1]
+        res = np.column_stack([mfr * self.temperature[1]**.5 / (p0**2 - p1**2)**.5 / self.stodola - 1,
+                               mfr * g['work_cycle'] / (power * 1000.) - 1])
+        return res, p, g
+
+        # ТАБЛИЦА РЕЖИМОВ ПО РЕШЕНИЯМ x И ПАКЕТНОМУ РАСЧЕТУ
+    def _frame(self, power, x, p, g):
+        pressure_min, pressure_rate, efc = self._machines(x)
+        # запас по давлению на входе компрессора (< 0 - режим недопустим)
+        margin = pressure_min / self.pressure_limit - 1
+        result = pd.DataFrame(dict(zip(partload_columns, (
+            power, power / self.power_design, x[:, 0] * self.mfr, pressure_min, pressure_rate,
+            efc[:, 1], efc[:, 6], p['temp'][:, 1], g['work_cycle'], g['efc_cycle'], margin))))
+        result['feasible'] = margin > 0
+        return result
+
+        # РЕЖИМ ЗАДАННОЙ МОЩНОСТИ (метод Ньютона): решение и матрица Якоби
+    def _solve(self, power, x0=(1., 1.), tol=1e-9, maxiter=20, step=1e-6):
+        x = np.array(x0, dtype=float)
+        for _ in range(maxiter):
+            # точка и смещения по расходу и давлению - один пакетный расчет
+            points = np.array([x, x + [step, 0], x + [0, step]])
+            res, p, g = self._residual(points, power)
+            jac = (res[1:] - res[0]).T / step
+            if np.max(np.abs(res[0])) < tol:
+                break
+            x = x - np.linalg.solve(jac, res[0])
+        else:
+            raise RuntimeError('PartLoad: no convergence at power ' + str(power))
+        return x, jac, p[:1], g[:1]
+
+        # РЕЖИМ ЗАДАННОЙ МОЩНОСТИ
+    def solve(self, power, x0=(1., 1.), tol=1e-9, maxiter=20, step=1e-6):
+        # power - мощность [кВт], x0 - начальное приближение (расход, давление - доли расчетных)
+        x, _, p, g = self._solve(power, x0, tol, maxiter, step)
+        row = self._frame(np.array([float(power)]), x[None, :], p, g).iloc[0].to_dict()
+        return row, x
+
+        # ХАРАКТЕРИСТИКА ПО РЯДУ НАГРУЗОК (теплый старт с соседнего режима)
+    def _curve(self, power):
+        # возвращает решения x (N, 2) и матрицы Якоби (N, 2, 2)
+        x, jac = np.zeros((len(power), 2)), np.zeros((len(power), 2, 2))
+        p, g = [None] * len(power), [None] * len(power)
+        # продолжение от расчетного режима в обе стороны
+        order = np.argsort(power)
+        for branch in (order[power[order] >= self.power_design],
+                       order[power[order] < self.power_design][::-1]):
+            x0 = (1., 1.)
+            for i in branch:
+                x[i], jac[i], p[i], g[i] = self._solve(power[i], x0=x0)
+                x0 = x[i]
+        return x, jac, np.concatenate(p), np.concatenate(g)
+
+    def curve(self, power):
+        power = np.atleast_1d(np.asarray(power, dtype=float))
+        x, _, p, g = self._curve(power)
+        return self._frame(power, x, p, g)
+
+        # ГРАФИК НАГРУЗКИ (теплый старт от характеристики в узлах)
+    def dispatch(self, power, n_nodes=25, tol=1e-8, maxiter=10):
+        # режимы графика - один пакетный расчет на итерацию: начальное приближение
+        # и матрица Якоби - интерполяция (PCHIP) решений в узлах, далее метод
+        # Ньютона с постоянной матрицей (tol - выше погрешности пакетного расчета ~1e-9)
+        # .attrs['interp_residual'] - невязка интерполяции узлов (до уточнения)
+        power = np.asarray(power, dtype=float)
+        loads, inverse = np.unique(power, return_inverse=True)
+        nodes = loads
+        if len(nodes) > n_nodes:
+            nodes = np.linspace(nodes[0], nodes[-1], n_nodes)
+        x_nodes, jac_nodes, p, g = self._curve(nodes)
+        if len(nodes) == len(loads):
+            x, residual = x_nodes, 0.
+        else:
+            x = PchipInterpolator(nodes, x_nodes)(loads)
+            jac = PchipInterpolator(nodes, jac_nodes)(loads)
+            for i in range(maxiter):
+                res, p, g = self._residual(x, loads)
+                if i == 0:
+                    residual = float(np.max(np.abs(res)))
+                if np.max(np.abs(res)) < tol:
+                    break
+                x = x - np.linalg.solve(jac, res[:, :, None])[:, :, 0]
+            else:
+                raise RuntimeError('PartLoad: no convergence of the load profile')
+        result = self._frame(loads, x, p, g).iloc[inverse.ravel()].reset_index(drop=True)
+        result.attrs['interp_residual'] = residual
+        return result
@@ -5,26 +5,26 @@ Created on Fri Jun 14 09:16:55 2024
 @author: User
 """
 
-import numpy as np
-import CoolProp as CP
 import matplotlib.pyplot as plt
 import math
+from allam.saturation import saturation_dome, fluid_constants
 
 class PTdiagrCO2:
     def plot(self):
-        fluid = CP.AbstractState("HEOS", "CO2")
-        pc = fluid.keyed_output(CP.iP_critical)
-        pmin = fluid.keyed_output(CP.iP_min)
+        # константы и линия насыщения - из хранилища (saturation)
+        fluid = fluid_constants('CO2')
+        pc = fluid.pres_crit
+        pmin = fluid.pres_min
         pmax = pc * 100
-        Tc = fluid.keyed_output(CP.iT_critical)
-        Tmin = fluid.keyed_output(CP.iT_min)
+        Tc = fluid.temp_crit
+        Tmin = fluid.temp_min
         Tmax = Tc * 2
         
         fig = plt.figure(figsize = (5,5))
         
         # Saturation curve
-        Ts = np.linspace(Tmin, Tc)
-        ps = CP.CoolProp.PropsSI('P','T',Ts,'Q',0,'CO2')
+        dome = saturation_dome('CO2')
+        Ts, ps = dome.temp, dome.pres
         
         # Labels
         plt.plot(Ts,ps,'orange',lw = 3)
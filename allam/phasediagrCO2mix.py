@@ -7,29 +7,33 @@ Created on Fri Jun 14 09:16:55 2024
 
 import numpy as np
 import pandas as pd
-import CoolProp as CP
 import matplotlib.pyplot as plt
 import math
+from allam.saturation import saturation_dome, fluid_constants
+from allam.envelope import phase_envelope
+from allam.cyclecore import cycle_frame
 
 class PTdiagrmix:
-    def __init__(self):
+    def __init__(self, cycle='cycle.csv'):
+        # cycle - результат в памяти (Acycle, CycleResult, DataFrame) или файл .csv
         pd.set_option('display.float_format', '{:.3f}'.format)
-        self.p = pd.read_csv('cycle.csv') 
+        self.p = cycle_frame(cycle)
     
     
     def plot(self):
         plt.figure(figsize=(5, 4))
-        carbondioxid = CP.AbstractState("HEOS", "CO2")
-        pc1 = carbondioxid.keyed_output(CP.iP_critical)
-        pmin1 = carbondioxid.keyed_output(CP.iP_min)
+        # константы и линии насыщения - из хранилища (saturation)
+        carbondioxid = fluid_constants('CO2')
+        pc1 = carbondioxid.pres_crit
+        pmin1 = carbondioxid.pres_min
         pmax1 = pc1 * 100
-        Tc1 = carbondioxid.keyed_output(CP.iT_critical)
-        Tmin1 = carbondioxid.keyed_output(CP.iT_min)
+        Tc1 = carbondioxid.temp_crit
+        Tmin1 = carbondioxid.temp_min
         Tmax1 = Tc1 * 2
         
         # Saturation curve
-        Ts1 = np.linspace(Tmin1, Tc1)
-        ps1 = CP.CoolProp.PropsSI('P','T',Ts1,'Q',0,'CO2')
+        dome = saturation_dome('CO2')
+        Ts1, ps1 = dome.temp, dome.pres
         
         # Labels
         plt.plot(Ts1,ps1,'orange', lw=3, label='carbondioxid')
@@ -38,17 +42,17 @@ class PTdiagrmix:
         plt.axvline(Tc1, dashes = [2, 2], color='orange', lw=1)
         plt.axhline(pc1, dashes = [2, 2], color='orange', lw=1)
         
-        water = CP.AbstractState('HEOS', 'Water')
-        pc2 = water.keyed_output(CP.iP_critical)
-        pmin2 = water.keyed_output(CP.iP_min)
+        water = fluid_constants('Water')
+        pc2 = water.pres_crit
+        pmin2 = water.pres_min
         pmax2 = pc2 * 100
-        Tc2 = water.keyed_output(CP.iT_critical)
-        Tmin2 = water.keyed_output(CP.iT_min)
+        Tc2 = water.temp_crit
+        Tmin2 = water.temp_min
         Tmax2 = Tc2 * 2
         
         # Saturation curve
-        Ts2 = np.linspace(Tmin2, Tc2, 10)
-        ps2 = CP.CoolProp.PropsSI('P','T',Ts2,'Q',0,'water')
+        dome = saturation_dome('Water')
+        Ts2, ps2 = dome.temp, dome.pres
         
         # Labels
         plt.plot(Ts2,ps2,'aqua', lw=3, label='water')
@@ -57,6 +61,10 @@ class PTdiagrmix:
         plt.axvline(Tc2, dashes = [2, 2], lw=1)
         plt.axhline(pc2, dashes = [2, 2], lw=1)
         
+        # линия точек росы смеси состава цикла (начало конденсации воды)
+        env = phase_envelope(self.p.CO2[0])
+        plt.plot(env.temp_dew, env.pres_dew, 'red', lw=1, dashes=[4, 2], label='mix dew')
+        
         x = np.append(self.p.temp, self.p.temp[0])
         y = np.append(self.p.pres, self.p.pres[0])
         
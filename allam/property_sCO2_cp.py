@@ -7,17 +7,45 @@ Created on Tue Nov 28 06:32:42 2023
 """
 
 import numpy as np
-from pyfluids import Fluid, FluidsList, Input
+import CoolProp as CP
 import matplotlib.pyplot as plt
+from scipy import constants as cst
+from allam.fluidstate import fluid_state
 
 class PropSCO2:
-    def __init__(self):
-        
-        self.fluid = Fluid(FluidsList.CarbonDioxide)
+    def __init__(self, backend=None):
+        # backend свойств (см. fluid_state): 'HEOS', 'BICUBIC&HEOS', 'pyfluids', 'grid';
+        # None - backend по умолчанию
+        self.backend = backend
+        
+        # СВОЙСТВА ДЛЯ МАССИВОВ ТОЧЕК: ОДИН РАСЧЕТ СОСТОЯНИЯ НА ТОЧКУ
+    def props(self, temp, press, keys=('sp_heat',)):
+        # temp [°C], press [Pa] - скаляры или массивы (broadcast)
+        # keys - enth, entr, dens, sp_heat, phase, compressibility
+        #        (строка - один массив, кортеж - словарь массивов)
+        temp = cst.convert_temperature(np.asarray(temp, dtype=float), 'C', 'K')
+        state = fluid_state('CO2', backend=self.backend)
+        st = state.tp(temp, press)
+        
+        res = {}
+        for key in ([keys] if isinstance(keys, str) else keys):
+            if key == 'compressibility':
+                # Z = p / (rho * R * T)
+                res[key] = st.pres / (st.dens * state.keyed(CP.igas_constant)
+                                       / state.keyed(CP.imolar_mass) * st.temp)
+            else:
+                res[key] = getattr(st, key)
+        return res[keys] if isinstance(keys, str) else res
         
     def cp(self, temp, press):
-        return self.fluid.with_state(
-            Input.pressure(press), Input.temperature(temp)).specific_heat / 1000
+        return self.props(temp, press, 'sp_heat') / 1000
+    
+        # ИЗОЭНТРОПНЫЙ ТЕПЛОПЕРЕПАД [Дж/кг] ДЛЯ МАССИВОВ ТОЧЕК
+    def _isentropic(self, temp, pressure_in, pressure_out):
+        temp = cst.convert_temperature(np.asarray(temp, dtype=float), 'C', 'K')
+        state = fluid_state('CO2', backend=self.backend)
+        st = state.tp(temp, pressure_in)
+        return np.abs(st.enth - state.ps(pressure_out, st.entr).enth)
     
     def diagramm_pressure(self, pressure, temperature):
         self.pressure = pressure # принимает кортеж
@@ -27,7 +55,7 @@ class PropSCO2:
         self.specific_heat = np.zeros(ps)
         self.pressure = np.linspace(self.pressure[0], self.pressure[1], ps)
         
-        self.specific_heat = np.vectorize(self.cp)
+        self.specific_heat = self.cp # массивы - без np.vectorize
         
         plt.figure(figsize=(6,5), dpi=300)
         
@@ -55,7 +83,7 @@ class PropSCO2:
         self.specific_heat = np.zeros(ts)
         self.temperature = np.linspace(self.temperature_set[0], self.temperature_set[1], ts)
         
-        self.specific_heat = np.vectorize(self.cp)
+        self.specific_heat = self.cp # массивы - без np.vectorize
         
         plt.figure(figsize=(6,5), dpi=300)
         
@@ -76,20 +104,14 @@ class PropSCO2:
         print(file_name)
 
     def turbine(self, pressure, pressure_rate, temperature):
-        pressure_out = pressure
+        pressure_out = np.asarray(pressure, dtype=float)
         pressure_in = pressure_out * pressure_rate
-        state_in = self.fluid.with_state(Input.pressure(pressure_in), 
-                    Input.temperature(temperature))
-        state_out = state_in.isentropic_expansion_to_pressure(pressure_out)
-        return abs(state_in.enthalpy - state_out.enthalpy)
+        return self._isentropic(temperature, pressure_in, pressure_out)
     
     def compressor(self, pressure, pressure_rate, temperature):
-        pressure_in = pressure
+        pressure_in = np.asarray(pressure, dtype=float)
         pressure_out = pressure_in * pressure_rate
-        state_in = self.fluid.with_state(Input.pressure(pressure_in), 
-                    Input.temperature(temperature))
-        state_out = state_in.isentropic_compression_to_pressure(pressure_out)
-        return abs(state_in.enthalpy - state_out.enthalpy)
+        return self._isentropic(temperature, pressure_in, pressure_out)
 
     def work(self, pressure, pressure_rate, temperature):
         # self.pressure = pressure # принимает кортеж
@@ -97,25 +119,17 @@ class PropSCO2:
         
         ps = 100
         self.pressure = np.linspace(pressure[0], pressure[1], ps)
-        self.turbine_diff = np.vectorize(self.turbine)
-        self.compressor_diff = np.vectorize(self.compressor)
+        # теплоперепады - один расчет на сетку (для графиков и работы)
+        compr = self.compressor(self.pressure, pressure_rate, temperature[0]) / 1000
+        turb = self.turbine(self.pressure, pressure_rate, temperature[1]) / 1000
 
         plt.figure(figsize=(6,5), dpi=300)
         
-        plt.plot(self.pressure/1e6, self.compressor_diff(pressure=self.pressure, 
-                                        pressure_rate=pressure_rate, 
-                                        temperature=temperature[0])/1000, 'b--', 
-                                        label= 'compr')
+        plt.plot(self.pressure/1e6, compr, 'b--', label= 'compr')
         
-        plt.plot(self.pressure/1e6, self.turbine_diff(pressure=self.pressure, 
-                                        pressure_rate=pressure_rate, 
-                                        temperature=temperature[1])/1000, 'g--', 
-                                        label= 'turbine')
+        plt.plot(self.pressure/1e6, turb, 'g--', label= 'turbine')
         
-        work = (self.turbine_diff(pressure=self.pressure, 
-                pressure_rate=pressure_rate, temperature=temperature[1]) -
-                self.compressor_diff(pressure=self.pressure, 
-                pressure_rate=pressure_rate, temperature=temperature[0])) /1000
+        work = turb - compr
         
         plt.plot(self.pressure/1e6, work, 'r', label= 'work')
         
@@ -139,14 +153,13 @@ class PropSCO2:
     def compressibility(self, pressure, temperature):
         ps = 100
         pressure = np.linspace(pressure[0], pressure[1], ps)
-        compr_func = lambda press: self.fluid.with_state(Input.pressure(press), 
-                    Input.temperature(t)).compressibility
-        compr = np.vectorize(compr_func)
+        # сетка давление x температура - один вызов
+        compr = self.props(np.asarray(temperature, dtype=float)[:, None], pressure,
+                           'compressibility')
         
         plt.figure(figsize=(6,5), dpi=300)
-        for temp in temperature:
-            t = temp
-            plt.plot(pressure/1e6, compr(pressure), label= 'T = '+str(t)+'$^{\circ}C$')
+        for t, z in zip(temperature, compr):
+            plt.plot(pressure/1e6, z, label= 'T = '+str(t)+'$^{\circ}C$')
         
         plt.vlines(7.38, 0, 1.1, linewidth=1, linestyle='--', color='black', 
                    label= '$P_{crit}$') # вертикальная линия
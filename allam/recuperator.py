@@ -3,19 +3,283 @@
 Created on Mon Jun 17 07:45:13 2024
 
 Расчет распределения температуры в рекуператоре
+
+recup_profile - профиль температур по сетке энтальпий (противоток):
+    - доля передаваемой теплоты x = 0 (горячий конец, точки 1, 7)
+      ... 1 (холодный конец, точки 2, 6), энтальпия каждого потока
+      линейна по x
+    - T(h) - обращение таблицы h(T) одного массивного расчета свойств
+      на поток, монотонная кубическая интерполяция (PCHIP)
+    - давление линейно между точками цикла
+    - tol - адаптивное деление участков (сгущение у пика cp холодного
+      CO2) до заданной ошибки температуры
+
+Recuperator - рекуператор заданного размера (UA или U * F), поверочный
+расчет: по входным температурам и давлениям - выходные температуры,
+тепловая мощность и dp_rel для точек 2 и 7 цикла
+    - UA = сумма dQ / dT_лог по участкам, мощность - brentq по UA(Q)
+    - таблицы h(T) потоков при давлениях входа и выхода - один расчет
+      на входные условия (кэш),
+      поиск мощности от предыдущего решения (теплый старт)
+    - UA ~ расход^ua_exp, потери давления ~ расход^2 / плотность
+    - результат - Profile: профили, минимальный пинч и его положение
+      (без графиков и файлов - для оптимизации)
+
+Температура в К, давление в Pa
 """
 
+from collections import namedtuple
 import pandas as pd
 import numpy as np
-from CoolProp.CoolProp import PropsSI
 import matplotlib.pyplot as plt
+from scipy.interpolate import PchipInterpolator
+from allam.fluidstate import fluid_state, mix_state
+from scipy.optimize import brentq
+from allam.cyclecore import cycle_frame, cycle_mix_state, CycleInputs
+
+Profile = namedtuple('Profile', ['x', 'temp_hot', 'temp_cold', 'dt', 'pinch', 'x_pinch',
+                                 'n_calls'])
+Rating = namedtuple('Rating', ['temp_hot', 'temp_cold', 'duty', 'dp_rel_hot', 'dp_rel_cold',
+                               'pinch', 'effectiveness'])
+
+
+    # T(h) ПО ТАБЛИЦЕ h(T) ПОТОКА
+def _temp_h(temp_grid, enth_grid):
+    order = np.argsort(enth_grid)
+    ok = np.isfinite(enth_grid[order])
+    return PchipInterpolator(enth_grid[order][ok], temp_grid[order][ok])
+
+
+    # УЗЛЫ h(T) ПОТОКА: РАВНОМЕРНЫЕ ИЛИ С АДАПТИВНЫМ ДЕЛЕНИЕМ
+def _stream_nodes(state, temp, pres, enth, n, tol=None, maxiter=20):
+    # temp, pres, enth - значения на концах (x = 0, x = 1), enth=None - по расчету
+    # tol - допустимая ошибка температуры [K]: участок делится пополам, пока
+    #       T(h) в середине отличается от интерполяции больше tol (оценка)
+    #       (участки с большим dcp/dT - у псевдокритической точки)
+    def enthalpy(temp_grid):
+        pres_grid = pres[0] + (pres[1] - pres[0]) * (temp_grid - temp[0]) / (temp[1] - temp[0])
+        return state.tp(temp_grid, pres_grid).enth
+
+    temp_grid = np.linspace(temp[0], temp[1], n + 1)
+    enth_grid = enthalpy(temp_grid)
+    if enth is not None:
+        enth_grid[[0, -1]] = enth
+    n_calls = n + 1
+    if tol is None:
+        return temp_grid, enth_grid, n_calls
+
+    active = np.ones(n, dtype=bool)
+    for _ in range(maxiter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        temp_mid = (temp_grid[idx] + temp_grid[idx + 1]) / 2
+        enth_mid = enthalpy(temp_mid)
+        n_calls += idx.size
+        err = np.abs(_temp_h(temp_grid, enth_grid)(enth_mid) - temp_mid)
+
+        # середины - новые узлы; дальше делятся только участки с ошибкой > tol
+        temp_grid = np.insert(temp_grid, idx + 1, temp_mid)
+        enth_grid = np.insert(enth_grid, idx + 1, enth_mid)
+        split = idx + np.arange(idx.size) # новый номер левой половины
+        active = np.zeros(temp_grid.size - 1, dtype=bool)
+        refine = split[err > tol]
+        # PCHIP не локален: соседние участки тоже проверяются
+        active[np.clip(np.concatenate([refine - 1, refine, refine + 1, refine + 2]),
+                       0, active.size - 1)] = True
+    return temp_grid, enth_grid, n_calls
+
+
+    # ПРОФИЛЬ ТЕМПЕРАТУР И МИНИМАЛЬНЫЙ ПИНЧ
+def recup_profile(p, n=None, mix_table=None, fluid=None, tol=None):
+    # p - параметры в точках цикла (CycleResult.p, DataFrame)
+    # n - число участков (по умолчанию 100; при tol - начальное, по умолчанию 8)
+    # fluid - строка CoolProp горячей смеси (по умолчанию CO2/H2O по p['CO2'][0])
+    # tol - адаптивное деление участков до ошибки температуры tol [K]
+    temp, pres, enth = (np.asarray(p[col], dtype=float) for col in ('temp', 'pres', 'enth'))
+    if mix_table is not None:
+        hot = mix_table.state(float(p['CO2'][0]))
+    else:
+        hot = mix_state(fluid or 'CO2[' + str(p['CO2'][0]) + ']&water[' + str(p['H2O'][0]) + ']')
+    cold = fluid_state('CO2', phase='supercritical')
+    if n is None:
+        n = 100 if tol is None else 8
+
+    streams = [(hot, [1, 2]), (cold, [7, 6])]
+    nodes = [_stream_nodes(state, temp[i], pres[i], enth[i], n, tol) for state, i in streams]
+    if tol is None:
+        x = np.linspace(0, 1, n + 1)
+    else:
+        # узлы обоих потоков в координате x
+        x = np.unique(np.clip(np.concatenate(
+            [(enth_grid - enth[i][0]) / (enth[i][1] - enth[i][0])
+             for (_, i), (_, enth_grid, _) in zip(streams, nodes)]), 0, 1))
+    temp_h = [lambda x, i=i, f=_temp_h(temp_grid, enth_grid): f(enth[i][0] + (enth[i][1] - enth[i][0]) * x)
+              for (_, i), (temp_grid, enth_grid, _) in zip(streams, nodes)]
+    temp_hot, temp_cold = temp_h[0](x), temp_h[1](x)
+    dt = temp_hot - temp_cold
+
+    # минимум напора между узлами - по интерполяции (без расчета свойств)
+    k = int(np.nanargmin(dt))
+    x_fine = np.linspace(x[max(k - 1, 0)], x[min(k + 1, x.size - 1)], 201)
+    dt_fine = temp_h[0](x_fine) - temp_h[1](x_fine)
+    j = int(np.nanargmin(dt_fine))
+    return Profile(x, temp_hot, temp_cold, dt, dt_fine[j], x_fine[j], sum(node[2] for node in nodes))
+
+
+class Recuperator:
+    def __init__(self, ua=None, area=None, u=None, dp_rel=None, mass=(1., 1.),
+                 dens=(None, None), n=50, tol=0.01, ua_exp=0.8):
+        # ua - [Вт/К] при расходах mass (по умолчанию на 1 кг/с продуктов сгорания)
+        #      или area [м2] * u [Вт/(м2*К)]
+        # dp_rel - относительные потери давления (горячая, холодная сторона)
+        #          при расходах mass [кг/с] и плотностях на входе dens [кг/м3]
+        #          (по умолчанию - dp_rel точек 2, 7 Acycle)
+        # n - число участков, tol - ошибка температуры таблиц h(T) [K]
+        self.ua = ua if ua is not None else area * u
+        if dp_rel is None:
+            dp_rel = tuple(CycleInputs._field_defaults['dp_rel'][i] for i in (2, 7))
+        self.dp_rel = dp_rel
+        self.mass = mass
+        self.dens = dens
+        self.n = n
+        self.tol = tol
+        self.ua_exp = ua_exp
+        self.reset()
+
+        # СБРОС КЭША ТАБЛИЦ И ТЕПЛОГО СТАРТА
+    def reset(self):
+        self._key = None
+        self._tables = None
+        self.duty = None # последнее решение [Вт]
+        self.n_calls = 0 # число обращений к свойствам
+
+        # РАЗМЕР ПО РАСЧЕТНОМУ РЕЖИМУ ЦИКЛА
+    @classmethod
+    def from_cycle(cls, cycle, n=50, tol=0.01, **kw):
+        # cycle - CycleResult (Acycle.result): UA по профилю температур,
+        #         dp_rel точек 2, 7, расход CO2 на 1 кг продуктов сгорания
+        p = cycle.p
+        mix = cycle_mix_state(cycle.mol_CO2, cycle.inputs.mix_table, cycle.fluid)
+        rec = cls(ua=1., dp_rel=(p['dp_rel'][2], p['dp_rel'][7]),
+                  mass=(1., cycle.mass_CO2_recyc), dens=(p['dens'][1], p['dens'][6]),
+                  n=n, tol=tol, **kw)
+        rec.ua = rec._ua(p['enth'][1] - p['enth'][2], rec._prepare(
+            p['temp'][1], p['pres'][1], p['temp'][6], p['pres'][6], mix, 1., cycle.mass_CO2_recyc))
+        return rec
+
+        # ТАБЛИЦЫ h(T) ПОТОКОВ И ПОТЕРИ ДАВЛЕНИЯ (кэш по входным условиям)
+    def _prepare(self, temp_hot, pres_hot, temp_cold, pres_cold, hot, mass_hot, mass_cold):
+        key = (float(temp_hot), float(pres_hot), float(temp_cold), float(pres_cold),
+               getattr(hot, 'fluid', hot), mass_hot, mass_cold)
+        if key == self._key:
+            return self._tables
+        hot = hot if hasattr(hot, 'tp') else mix_state(hot)
+        cold = fluid_state('CO2', phase='supercritical')
+
+        dp_rel = []
+        for i, (state, temp, pres, mass) in enumerate(((hot, temp_hot, pres_hot, mass_hot),
+                                                       (cold, temp_cold, pres_cold, mass_cold))):
+            dens = state.tp(temp, pres).dens
+            dens0 = dens if self.dens[i] is None else self.dens[i]
+            dp = (1 - self.dp_rel[i]) * (mass / self.mass[i])**2 * dens0 / dens
+            dp_rel.append(float(1 - dp))
+
+        # таблицы T(h) при давлении на входе и на выходе потока во всем интервале
+        # температур (от входа одного потока до входа другого)
+        tables = []
+        for state, pres, rel, temp in ((hot, pres_hot, dp_rel[0], (temp_hot, temp_cold)),
+                                       (cold, pres_cold, dp_rel[1], (temp_cold, temp_hot))):
+            for pres_i in (pres, pres * rel):
+                temp_grid, enth_grid, n_calls = _stream_nodes(state, temp, (pres_i, pres_i), None,
+                                                              8, self.tol)
+                self.n_calls += n_calls
+                ok = np.isfinite(enth_grid)
+                order = np.argsort(temp_grid[ok])
+                tables.append((temp_grid[ok][order], enth_grid[ok][order]))
+
+        (th, hh), (th_out, hh_out), (tc, hc), (tc_out, hc_out) = tables
+        enth_hot = np.interp(temp_hot, th, hh)
+        enth_cold = np.interp(temp_cold, tc, hc)
+        # предельная мощность: горячий поток до входа холодного и наоборот
+        duty_max = min(mass_hot * (enth_hot - hh_out[0]), mass_cold * (hc_out[-1] - enth_cold))
+        self._key = key
+        self._tables = ([_temp_h(*table) for table in tables], enth_hot, enth_cold,
+                        mass_hot, mass_cold, duty_max, dp_rel)
+        return self._tables
+
+        # ТЕМПЕРАТУРЫ ПОТОКОВ ПО УЧАСТКАМ ПРИ МОЩНОСТИ duty
+    def _profile(self, duty, tables):
+        # давление линейно по x: T(h) - интерполяция между таблицами входа и выхода
+        hot_in, hot_out, cold_in, cold_out = tables[0]
+        enth_hot, enth_cold, mass_hot, mass_cold = tables[1:5]
+        x = np.linspace(0, 1, self.n + 1)
+        enth = enth_hot - duty * x / mass_hot
+        temp_hot = (1 - x) * hot_in(enth) + x * hot_out(enth)
+        enth = enth_cold + duty * (1 - x) / mass_cold
+        temp_cold = x * cold_in(enth) + (1 - x) * cold_out(enth)
+        return temp_hot, temp_cold
+
+        # UA ПРИ МОЩНОСТИ duty (сумма по участкам, среднелогарифмический напор)
+    def _ua(self, duty, tables):
+        temp_hot, temp_cold = self._profile(duty, tables)
+        dt = np.maximum(temp_hot - temp_cold, 1e-9)
+        dt0, dt1 = dt[:-1], dt[1:]
+        same = np.abs(dt0 - dt1) < 1e-9 * dt0
+        lmtd = np.where(same, dt0, (dt0 - dt1) / np.log(np.where(same, 2., dt0 / dt1)))
+        return np.sum(duty / self.n / lmtd)
+
+        # ПОВЕРОЧНЫЙ РАСЧЕТ
+    def rate(self, temp_hot, pres_hot, temp_cold, pres_cold, hot, mass_hot=None,
+             mass_cold=None):
+        # temp_hot, pres_hot - вход горячего потока (точка 1)
+        # temp_cold, pres_cold - вход холодного потока (точка 6)
+        # hot - строка CoolProp горячей смеси или готовое состояние (MixTable.state)
+        # mass_hot, mass_cold - расходы [кг/с] (по умолчанию - расчетные)
+        mass_hot = self.mass[0] if mass_hot is None else mass_hot
+        mass_cold = self.mass[1] if mass_cold is None else mass_cold
+        tables = self._prepare(temp_hot, pres_hot, temp_cold, pres_cold, hot, mass_hot, mass_cold)
+        duty_max, dp_rel = tables[5], tables[6]
+        ua = self.ua * (mass_hot / self.mass[0])**self.ua_exp
+
+        def func(duty):
+            return self._ua(duty, tables) - ua
+
+        # теплый старт - интервал около предыдущего решения
+        lo, hi = 0., duty_max * (1 - 1e-9)
+        if self.duty is not None and lo < self.duty < hi:
+            a, b = self.duty * 0.98, min(self.duty * 1.02, hi)
+            if func(a) < 0 < func(b):
+                lo, hi = a, b
+        self.duty = float(brentq(func, lo, hi, xtol=1e-9 * duty_max))
+
+        temp_hot_out, temp_cold_out = self._profile(self.duty, tables)
+        dt = temp_hot_out - temp_cold_out
+        return Rating(temp_hot=float(temp_hot_out[-1]), temp_cold=float(temp_cold_out[0]),
+                      duty=self.duty, dp_rel_hot=dp_rel[0], dp_rel_cold=dp_rel[1],
+                      pinch=float(dt.min()), effectiveness=float(self.duty / duty_max))
+
+        # ПОВЕРОЧНЫЙ РАСЧЕТ ПО РЕЗУЛЬТАТУ ЦИКЛА (вход - точки 1, 6)
+    def rate_cycle(self, cycle, mass_hot=None):
+        # cycle - CycleResult; расход CO2 - mass_CO2_recyc на 1 кг продуктов сгорания
+        p = cycle.p
+        mass_hot = self.mass[0] if mass_hot is None else mass_hot
+        hot = cycle_mix_state(cycle.mol_CO2, cycle.inputs.mix_table, cycle.fluid)
+        return self.rate(p['temp'][1], p['pres'][1], p['temp'][6], p['pres'][6], hot,
+                         mass_hot=mass_hot, mass_cold=mass_hot * cycle.mass_CO2_recyc)
 
 
 class HeatEx:
-    def __init__(self):
+    def __init__(self, cycle='cycle.csv', mix_table=None):
+        # cycle - результат в памяти (Acycle, CycleResult, DataFrame) или файл .csv
         pd.set_option('display.float_format', '{:.3f}'.format)
-        self.p = pd.read_csv('cycle.csv') 
+        self.p = cycle_frame(cycle)
         self.mix = 'CO2[' + str(self.p.CO2[0]) + ']&water[' + str(self.p.H2O[0]) + ']'
+        # смесь продуктов сгорания из результата в памяти (Acycle, CycleResult)
+        result = getattr(cycle, 'result', cycle)
+        self.fluid = getattr(result, 'fluid', None) if not isinstance(result, pd.DataFrame) else None
+        # таблица свойств смеси (MixTable) для горячей стороны вместо расчета смеси
+        self.mix_table = mix_table
         self.r = pd.DataFrame(columns=['x0_cycle','x1_cycle','x0','x1','x0res','x1res'], 
                               index=['hot','cold','dt'])
         
@@ -26,34 +290,35 @@ class HeatEx:
         self.r.loc['hot', 'x1_cycle'] = self.p.temp[2]
         self.r.loc['cold', 'x1_cycle'] = self.p.temp[6]
         self.r.loc['dt', 'x1_cycle'] = self.p.temp[2] - self.p.temp[6]
+
+        # СОСТОЯНИЕ СМЕСИ ГОРЯЧЕЙ СТОРОНЫ: ТАБЛИЦА ИЛИ COOLPROP
+    def _hot(self):
+        if self.mix_table is not None:
+            return self.mix_table.state(self.p.CO2[0])
+        return mix_state(self.fluid or self.mix)
     
-    def solve(self):
-        n = 100
-        x = np.linspace(0, 1, n)
-        th = np.zeros(n)
-        dh_hot = (self.p.enth[2] - self.p.enth[1]) / n      
-        th[0] = self.p.temp[1]
-        for i in range(n-1):
-            th[i+1] = th[i] + dh_hot / PropsSI('C','T|supercritical',th[i],'P',self.p.pres[1],self.mix)
-        
-        x = np.linspace(1, 0, n)
-        tc = np.zeros(n)
-        dh_cold = (self.p.enth[7] - self.p.enth[6]) / n      
-        tc[0] = self.p.temp[6]
-        for i in range(n-1):
-            tc[i+1] = tc[i] + dh_cold / PropsSI('C','T|supercritical',tc[i],'P',self.p.pres[6],'CO2')
+    def solve(self, n=None, plot=True, tol=None):
+        self.profile = recup_profile(self.p, n=n, mix_table=self.mix_table, fluid=self.fluid,
+                                     tol=tol)
+        x, th, tc = self.profile.x, self.profile.temp_hot, self.profile.temp_cold
         
         self.r.loc['hot', 'x0'] = th[0]
-        self.r.loc['cold', 'x0'] = tc[-1]
-        self.r.loc['dt', 'x0'] = th[0] - tc[-1]
+        self.r.loc['cold', 'x0'] = tc[0]
+        self.r.loc['dt', 'x0'] = th[0] - tc[0]
         
         self.r.loc['hot', 'x1'] = th[-1]
-        self.r.loc['cold', 'x1'] = tc[0]
-        self.r.loc['dt', 'x1'] = th[-1] - tc[0]
+        self.r.loc['cold', 'x1'] = tc[-1]
+        self.r.loc['dt', 'x1'] = th[-1] - tc[-1]
         
         self.r.x0res =  self.r.x0_cycle - self.r.x0
         self.r.x1res =  self.r.x1_cycle - self.r.x1
         
+        # минимальный температурный напор внутри рекуператора
+        self.pinch = self.profile.pinch
+        self.x_pinch = self.profile.x_pinch
+        if not plot:
+            return self.profile
+        
         # plt.plot(x, th, color='red', label='hot')
         # plt.plot(x, tc, color='blue', label='cold')
 
@@ -61,7 +326,7 @@ class HeatEx:
         fig.set_figheight(4)
         fig.set_figwidth(5)
         
-        ax.plot(x[::-1], th, color='red', label='T hot')
+        ax.plot(x, th, color='red', label='T hot')
         ax.plot(x, tc, color='blue', label='T cold')
         
         ax.set_xlabel('x')
@@ -71,9 +336,10 @@ class HeatEx:
 
         ax1 = ax.twinx()
         
-        dt = th[::-1] - tc
+        dt = self.profile.dt
 
         ax1.plot(x, dt, color='green',linestyle='--',label='dT')
+        ax1.plot(self.x_pinch, self.pinch, 'o', color='green')
         
         ax1.set_ylabel('dT [K]')
         ax1.set_ylim(0,140)
@@ -83,17 +349,18 @@ class HeatEx:
         fig.tight_layout()
         fig.savefig('TX_recup.jpg', dpi = 300)
         plt.show()
+        return self.profile
 
     def spheat(self):
         plt.figure(figsize=(5, 4))
         n = 100
         x = np.linspace(0, 1, n)
         th = np.linspace(self.p.temp[1], self.p.temp[2], n)
-        cph = PropsSI('C','T|supercritical',th,'P',self.p.pres[1],self.mix)
+        cph = self._hot().tp(th, self.p.pres[1]).sp_heat
         plt.plot(th, cph, color='red', label='hot')
         
         tc = np.linspace(self.p.temp[7], self.p.temp[6], n)
-        cph = PropsSI('C','T|supercritical',th,'P',self.p.pres[6],'CO2')
+        cph = fluid_state('CO2', phase='supercritical').tp(tc, self.p.pres[6]).sp_heat
         plt.plot(tc, cph, color='blue', label='cold')
         
         plt.minorticks_on()
@@ -111,11 +378,11 @@ class HeatEx:
         n = 100
         x = np.linspace(0, 1, n)
         th = np.linspace(self.p.temp[1], self.p.temp[2], n)
-        cph = PropsSI('D','T|supercritical',th,'P',self.p.pres[1],self.mix)
+        cph = self._hot().tp(th, self.p.pres[1]).dens
         plt.plot(th, cph, color='red', label='hot')
         
         tc = np.linspace(self.p.temp[7], self.p.temp[6], n)
-        cph = PropsSI('D','T|supercritical',th,'P',self.p.pres[6],'CO2')
+        cph = fluid_state('CO2', phase='supercritical').tp(tc, self.p.pres[6]).dens
         plt.plot(tc, cph, color='blue', label='cold')
         
         plt.minorticks_on()
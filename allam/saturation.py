@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Sep  8 10:12:05 2024
+
+ЛИНИИ НАСЫЩЕНИЯ И КОНСТАНТЫ ВЕЩЕСТВ (ХРАНИЛИЩЕ)
+
+Постоянные данные для диаграмм и проверки фазы (CO2, вода, HEOS):
+    - saturation_dome - кипящая жидкость и сухой насыщенный пар от
+      тройной точки до критической: T, P, s, h (узлы сгущаются к
+      критической точке - купол круто сходится)
+    - fluid_constants - критическая и тройная точки, границы
+      применимости уравнения состояния, молярная масса
+    - sat_pressure - давление насыщения по температуре (интерполяция
+      ln P по линии насыщения, PCHIP)
+Данные рассчитываются один раз на процесс и сохраняются в .npz
+(каталог кэша ~/.allam), далее загружаются с диска.
+
+Температура в К, давление в Pa
+"""
+
+import os
+import threading
+from collections import namedtuple
+import numpy as np
+import CoolProp as CP
+from scipy.interpolate import PchipInterpolator
+from allam.fluidstate import fluid_state
+from allam.tabular import cache_path, save_atomic
+
+Dome = namedtuple('Dome', ['temp', 'pres', 'entr_liq', 'entr_vap', 'enth_liq', 'enth_vap'])
+FluidConstants = namedtuple('FluidConstants', ['temp_crit', 'pres_crit', 'temp_triple', 'pres_triple',
+                                               'temp_min', 'temp_max', 'pres_min', 'pres_max',
+                                               'molar_mass'])
+
+_constants_keys = (CP.iT_critical, CP.iP_critical, CP.iT_triple, CP.iP_triple,
+                   CP.iT_min, CP.iT_max, CP.iP_min, CP.iP_max, CP.imolar_mass)
+
+_store = {}
+_lock = threading.Lock()
+
+
+    # РАСЧЕТ ЛИНИИ НАСЫЩЕНИЯ И КОНСТАНТ
+def _build(fluid, n):
+    state = fluid_state(fluid, backend='HEOS')
+    constants = FluidConstants(*(state.keyed(key) for key in _constants_keys))
+    x = np.sin(np.linspace(0, np.pi / 2, n))
+    temp = constants.temp_triple + (constants.temp_crit - 1e-3 - constants.temp_triple) * x
+    liq, vap = state.qt(0, temp), state.qt(1, temp)
+    return Dome(temp, liq.pres, liq.entr, vap.entr, liq.enth, vap.enth), constants
+
+
+    # ДАННЫЕ ВЕЩЕСТВА ИЗ ХРАНИЛИЩА (память процесса, диск)
+def _saturation(fluid, n):
+    key = (fluid, n)
+    data = _store.get(key)
+    if data is not None:
+        return data
+    with _lock:
+        if key not in _store:
+            path = cache_path('saturation_' + fluid + '_' + str(n) + '.npz')
+            if os.path.exists(path):
+                file = np.load(path)
+                dome = Dome(*(file[col] for col in Dome._fields))
+                constants = FluidConstants(*(float(v) for v in file['constants']))
+            else:
+                dome, constants = _build(fluid, n)
+                save_atomic(path, lambda file: np.savez(file, constants=np.array(constants),
+                                                        **dome._asdict()))
+            for col in dome:
+                col.flags.writeable = False
+            # ln P(T) - для давления насыщения
+            interp = PchipInterpolator(dome.temp, np.log(dome.pres))
+            _store[key] = (dome, constants, interp)
+    return _store[key]
+
+
+def saturation_dome(fluid='CO2', n=200):
+    return _saturation(fluid, n)[0]
+
+
+def fluid_constants(fluid='CO2'):
+    return _saturation(fluid, 200)[1]
+
+
+    # ДАВЛЕНИЕ НАСЫЩЕНИЯ (вне линии насыщения - nan)
+def sat_pressure(temp, fluid='CO2'):
+    dome, constants, interp = _saturation(fluid, 200)
+    temp = np.asarray(temp, dtype=float)
+    pres = np.exp(interp(temp))
+    pres = np.where((temp >= constants.temp_triple) & (temp <= constants.temp_crit), pres, np.nan)
+    # последний узел купола - на 1e-3 K ниже критической точки
+    pres = np.where((temp > dome.temp[-1]) & (temp <= constants.temp_crit), constants.pres_crit, pres)
+    return pres[()]
@@ -3,10 +3,50 @@
 Created on Fri Jan 19 07:22:41 2024
 
 @author: User
+
+ТЕРМОХИМИЧЕСКИЕ ДАННЫЕ
+
+SpHeatVol - средняя объемная теплоемкость в интервале 0...t °C,
+полином по t [Дж/(м3*К)]; N2, Ar - по идеально-газовой энтальпии CoolProp
+species - компоненты топлива, окислителя и продуктов сгорания:
+    имя CoolProp, атомы C, H, O, низшая теплота сгорания [Дж/м3]
+thermo_table() - молярные массы и полиномы теплоемкости, рассчитываются
+один раз на процесс (общие для всех Combust)
 """
 
+from functools import lru_cache
+import numpy as np
+import CoolProp as CP
+from allam.fluidstate import fluid_state
+
 class SpHeatVol:
     spHvol_CO2_coef = [ 1.63479959e+03,  9.75263813e-01, -5.45793612e-04,  1.83324681e-07, -2.67917924e-11]
     spHvol_H2O_coef = [ 1.49735370e+03,  1.18320983e-01,  1.79154428e-04, -8.92543875e-08,  1.34614261e-11]
     spHvol_O2_coef = [ 1.30543577e+03,  1.74761949e-01,  6.42329236e-05, -8.82987243e-08,  2.28704857e-11]
+    spHvol_N2_coef = [ 1.29971447e+03, -2.05768023e-02,  2.42925374e-04, -1.57692529e-07,  3.29159223e-11]
+    spHvol_Ar_coef = [ 9.27381551e+02,  0.,              0.,              0.,              0.]
+
+
+# имя CoolProp, C, H, O, низшая теплота сгорания [Дж/м3]
+species = {
+    'CH4': ('methane', 1, 4, 0, 35800000.),
+    'C2H6': ('ethane', 2, 6, 0, 63800000.),
+    'C3H8': ('propane', 3, 8, 0, 91300000.),
+    'H2': ('hydrogen', 0, 2, 0, 10800000.),
+    'CO': ('CarbonMonoxide', 1, 0, 1, 12640000.),
+    'CO2': ('CO2', 1, 0, 2, 0.),
+    'H2O': ('water', 0, 2, 1, 0.),
+    'O2': ('oxygen', 0, 0, 2, 0.),
+    'N2': ('nitrogen', 0, 0, 0, 0.),
+    'Ar': ('argon', 0, 0, 0, 0.),
+}
+
 
+    # МОЛЯРНЫЕ МАССЫ И ПОЛИНОМЫ ТЕПЛОЕМКОСТИ (один раз на процесс)
+@lru_cache(maxsize=None)
+def thermo_table():
+    mol_mass = {name: fluid_state(data[0], backend='HEOS').keyed(CP.imolar_mass)
+                for name, data in species.items()}
+    spHv_pol = {name: np.polynomial.Polynomial(getattr(SpHeatVol, 'spHvol_' + name + '_coef'))
+                for name in ('CO2', 'H2O', 'O2', 'N2', 'Ar')}
+    return mol_mass, spHv_pol
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Aug 17 09:20:44 2024
+
+РАСЧЕТ ЦИКЛА НА СЕТКЕ ВХОДНЫХ ПАРАМЕТРОВ
+
+cycle_sweep - N-мерная сетка по любым входным данным cycle():
+    pressure_min, pressure_rate, temp_compr, temp_turb, temp_recyc
+    - точки сетки делятся на блоки (chunksize), блок считается пакетно
+      (Acycle.cycle_batch) в отдельном процессе (CoolProp удерживает GIL)
+    - результат - DataFrame: входные данные + k_recyc, pinch, work_cycle,
+      efc_cycle (dew=True - и temp_dew); форма сетки в .attrs['shape']
+
+sweep_grid - значения результата в форме сетки (для карт)
+plot_sweep - построение графика отдельно от расчета
+
+Температура в К, давление в Pa
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from allam.fluidstate import default_backend
+
+sweep_inputs = ('pressure_min', 'pressure_rate', 'temp_compr', 'temp_turb', 'temp_recyc')
+sweep_outputs = ('k_recyc', 'pinch', 'work_cycle', 'efc_cycle')
+
+
+    # РАСЧЕТ БЛОКА ТОЧЕК (выполняется в процессе пула)
+def _sweep_chunk(args):
+    from allam.allam import Acycle
+
+    values, dp_rel, efc, backend, mix_table, fuel, dew = args
+    sco = Acycle(backend=backend, mix_table=mix_table, **fuel)
+    sco.p['dp_rel'] = dp_rel
+    sco.p['efc'] = efc
+    _, g = sco.cycle_batch(pressure_min=values[0], pressure_rate=values[1],
+                           temperature=(values[2], values[3], values[4]), dew=dew)
+    return np.column_stack([g[col] for col in g.dtype.names])
+
+
+    # РАСЧЕТ НА СЕТКЕ
+def cycle_sweep(grid, fixed=None, dp_rel=None, efc=None, backend=None, mix_table=None,
+                n_jobs=None, chunksize=None, fuel=None, oxidant=None, excess_O2=0., dew=False):
+    # grid - {вход: массив значений} - оси сетки (порядок ключей - порядок осей)
+    # fixed - {вход: значение} - остальные входные данные
+    # dp_rel, efc - потери давления и КПД по точкам (по умолчанию как в Acycle)
+    # n_jobs - число процессов (None - все ядра, 1 - без пула)
+    # fuel, oxidant, excess_O2 - топливо и окислитель (см. Combust)
+    # dew - добавить точку росы за рекуператором temp_dew (см. Acycle.cycle_batch)
+    fixed = dict(fixed or {})
+    for key in list(grid) + list(fixed):
+        if key not in sweep_inputs:
+            raise ValueError('unknown cycle input: ' + str(key))
+    missing = [key for key in sweep_inputs if key not in grid and key not in fixed]
+    if missing:
+        raise ValueError('cycle inputs are not set: ' + ', '.join(missing))
+
+    axes = [np.atleast_1d(np.asarray(grid[key], dtype=float)) for key in grid]
+    shape = tuple(len(ax) for ax in axes)
+    mesh = dict(zip(grid, (m.ravel() for m in np.meshgrid(*axes, indexing='ij'))))
+    n = int(np.prod(shape))
+    values = np.array([mesh[key] if key in mesh else np.full(n, float(fixed[key]))
+                       for key in sweep_inputs])
+
+    if dp_rel is None or efc is None:
+        from allam.allam import Acycle
+        default = Acycle().p
+        dp_rel = default.dp_rel.to_numpy(dtype=float) if dp_rel is None else dp_rel
+        efc = default.efc.to_numpy(dtype=float) if efc is None else efc
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if chunksize is None:
+        # несколько блоков на процесс - выравнивание нагрузки
+        chunksize = max(1, -(-n // (4 * n_jobs)))
+    fuel = {'fuel': fuel, 'oxidant': oxidant, 'excess_O2': excess_O2}
+    # backend по умолчанию - из этого процесса (в пуле может быть другим)
+    backend = backend or default_backend()
+    chunks = [(values[:, i:i + chunksize], dp_rel, efc, backend, mix_table, fuel, dew)
+              for i in range(0, n, chunksize)]
+
+    if n_jobs == 1 or len(chunks) == 1:
+        res = [_sweep_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(chunks))) as pool:
+            res = list(pool.map(_sweep_chunk, chunks))
+
+    result = pd.DataFrame(values.T, columns=sweep_inputs)
+    result[list(sweep_outputs) + (['temp_dew'] if dew else [])] = np.concatenate(res)
+    result.attrs['shape'] = shape
+    result.attrs['axes'] = list(grid)
+    return result
+
+
+    # ЗНАЧЕНИЯ РЕЗУЛЬТАТА В ФОРМЕ СЕТКИ
+def sweep_grid(result, value='efc_cycle'):
+    return result[value].to_numpy().reshape(result.attrs['shape'])
+
+
+    # ГРАФИК РЕЗУЛЬТАТА (1D - линия, 2D - карта изолиний)
+def plot_sweep(result, value='efc_cycle', deg=None, xlabel=None, ylabel=None, file_name=None,
+               ax=None):
+    # deg - степень сглаживающего полинома (1D)
+    axes = result.attrs['axes']
+    if ax is None:
+        plt.figure(figsize=(5, 4))
+        ax = plt.gca()
+
+    if len(axes) == 1:
+        x, y = result[axes[0]].to_numpy(), result[value].to_numpy()
+        if deg is not None:
+            y = np.polynomial.Polynomial.fit(x, y, deg=deg)(x)
+        ax.plot(x, y)
+        ax.set_xlabel(xlabel or axes[0])
+        ax.set_ylabel(ylabel or value)
+    elif len(axes) == 2:
+        x = sweep_grid(result, axes[0])
+        y = sweep_grid(result, axes[1])
+        cs = ax.contourf(x, y, sweep_grid(result, value), levels=20)
+        plt.colorbar(cs, ax=ax, label=value)
+        ax.set_xlabel(xlabel or axes[0])
+        ax.set_ylabel(ylabel or axes[1])
+    else:
+        raise ValueError('plot_sweep: 1D or 2D grid is expected, got ' + str(len(axes)) + 'D')
+
+    ax.minorticks_on()
+    ax.grid(linestyle='--', linewidth=0.5, color='black') # сетка
+    plt.tight_layout() # оптимизируем поля и расположение объектов
+    if file_name is not None:
+        plt.savefig(file_name, dpi=300)
+    return ax
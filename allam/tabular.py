@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Aug 10 10:05:31 2024
+
+ТАБЛИЧНЫЕ СВОЙСТВА CO2
+
+Табличный backend CoolProp ('BICUBIC&HEOS', 'TTSE&HEOS'):
+    - таблицы строятся при первом обращении (~20 с) и сохраняются
+      CoolProp на диск (~/.CoolProp/Tables), далее загружаются с диска
+    - расчет состояния - единицы микросекунд (HEOS - десятки)
+
+tabular_accuracy - отчет о погрешности таблиц относительно HEOS,
+по умолчанию в околокритической области (пик cp).
+
+MixTable - таблица свойств смеси CO2/H2O по (T, P, x_CO2), хранится
+в .npz (каталог кэша ~/.allam, имя файла - по параметрам сетки),
+интерполяция вместо расчета смеси.
+
+FluidTable - таблица свойств чистого вещества по (T, P), хранится
+в .npz (каталог кэша, имя - по веществу и сетке), backend 'grid' в fluid_state: билинейная
+интерполяция, (h, P) и (P, s) - обращение столбца таблицы.
+
+Температура в К, давление в Pa
+"""
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+import CoolProp as CP
+from allam.fluidstate import State, fluid_state, mix_state
+
+
+    # ПОГРЕШНОСТЬ ТАБЛИЧНОГО BACKEND ОТНОСИТЕЛЬНО HEOS
+def tabular_accuracy(backend='BICUBIC&HEOS', temperature=(300., 340.),
+                     pressure=(7.4e6, 12e6), n=41, fluid='CO2'):
+    temp, pres = np.meshgrid(np.linspace(temperature[0], temperature[1], n),
+                             np.linspace(pressure[0], pressure[1], n))
+    ref = fluid_state(fluid, backend='HEOS').tp(temp, pres)
+    tab = fluid_state(fluid, backend=backend).tp(temp, pres)
+
+    report = pd.DataFrame(columns=['max_rel', 'mean_rel', 'temp_max', 'pres_max'],
+                          index=['enth', 'entr', 'dens', 'sp_heat'], dtype=float)
+    for key in report.index:
+        err = np.abs(getattr(tab, key) / getattr(ref, key) - 1)
+        i = np.nanargmax(err)
+        report.loc[key] = (err.flat[i], np.nanmean(err), temp.flat[i], pres.flat[i])
+    return report
+
+
+    # ПУТЬ К ФАЙЛУ В КАТАЛОГЕ КЭША ПАКЕТА (~/.allam или $ALLAM_CACHE)
+def cache_path(name):
+    path = os.environ.get('ALLAM_CACHE', os.path.join(os.path.expanduser('~'), '.allam'))
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, name)
+
+
+    # ИМЯ ФАЙЛА ПО ОСЯМ СЕТКИ (другая сетка - другой файл)
+def grid_name(prefix, axes):
+    digest = hashlib.sha1(b''.join(np.asarray(ax, dtype=float).tobytes() for ax in axes))
+    return prefix + '_' + digest.hexdigest()[:12] + '.npz'
+
+
+    # ЗАПИСЬ ЧЕРЕЗ ВРЕМЕННЫЙ ФАЙЛ И ПЕРЕИМЕНОВАНИЕ
+    # (параллельные процессы не видят недописанный файл)
+def save_atomic(path, save):
+    tmp = path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp, 'wb') as file:
+        save(file)
+    os.replace(tmp, path)
+
+
+def _same_axes(axes, other):
+    return len(axes) == len(other) and all(a.shape == b.shape and np.allclose(a, b)
+                                           for a, b in zip(axes, other))
+
+
+class MixTable:
+    '''
+    ТАБЛИЦА СВОЙСТВ СМЕСИ CO2/H2O (продукты сгорания, точки 0-2)
+
+    Сетка (T, P, x_CO2) со свойствами h, s, rho, cp (фаза - сверхкритическая,
+    как 'T|supercritical'), трилинейная интерполяция.
+    .error - оценка погрешности (максимальная относительная ошибка в центрах
+    ячеек относительно HEOS)
+    '''
+    keys = ('enth', 'entr', 'dens', 'sp_heat')
+
+    def __init__(self, temperature=(290., 1500.), pressure=(6e6, 22e6), mol_CO2=(0.9, 0.99),
+                 shape=(243, 33, 10)):
+        # температура - от выхода компрессора (точка 2 может быть ниже 350 K), шаг 5 K
+        self.axes = [np.linspace(*bounds, num) for bounds, num in
+                     zip((temperature, pressure, mol_CO2), shape)]
+        self.data = None
+        self.error = None
+        self._states = {}
+
+        # РАСЧЕТ ТАБЛИЦЫ
+    def build(self, n_check=500, seed=0):
+        temp, pres = np.meshgrid(self.axes[0], self.axes[1], indexing='ij')
+        self.data = np.empty(tuple(len(ax) for ax in self.axes) + (len(self.keys),))
+        for k, mol in enumerate(self.axes[2]):
+            state = mix_state(self._fluid(mol)).tp(temp, pres)
+            for i, key in enumerate(self.keys):
+                self.data[:, :, k, i] = getattr(state, key)
+
+        # оценка погрешности в центрах случайных ячеек
+        rng = np.random.default_rng(seed)
+        point = [ax[rng.integers(0, len(ax) - 1, n_check)] + (ax[1] - ax[0]) / 2
+                 for ax in self.axes]
+        approx = self._interp(*point)
+        err = np.zeros((n_check, len(self.keys)))
+        for n in range(n_check):
+            ref = mix_state(self._fluid(point[2][n])).tp(point[0][n], point[1][n])
+            err[n] = [abs(approx[n, i] / getattr(ref, key) - 1)
+                      for i, key in enumerate(self.keys)]
+        self.error = pd.Series(np.nanmax(err, axis=0), index=self.keys)
+        return self
+
+    @staticmethod
+    def _fluid(mol):
+        return 'CO2[' + str(round(float(mol), 4)) + ']&water[' + str(round(1 - float(mol), 4)) + ']'
+
+        # СОХРАНЕНИЕ / ЗАГРУЗКА
+    def save(self, path):
+        np.savez_compressed(path, temperature=self.axes[0], pressure=self.axes[1],
+                            mol_CO2=self.axes[2], data=self.data, error=self.error.to_numpy())
+
+    @classmethod
+    def load(cls, path):
+        file = np.load(path)
+        table = cls.__new__(cls)
+        table.axes = [file['temperature'], file['pressure'], file['mol_CO2']]
+        table.data = file['data']
+        table.error = pd.Series(file['error'], index=cls.keys)
+        table._states = {}
+        return table
+
+    @classmethod
+    def cached(cls, name=None, **grid):
+        # name - имя файла (по умолчанию - по параметрам сетки); загруженная
+        # таблица с другой сеткой пересчитывается
+        table = cls(**grid)
+        path = cache_path(name or grid_name('mix_table', table.axes))
+        if os.path.exists(path):
+            loaded = cls.load(path)
+            if _same_axes(loaded.axes, table.axes):
+                return loaded
+        table.build()
+        save_atomic(path, table.save)
+        return table
+
+        # ТРИЛИНЕЙНАЯ ИНТЕРПОЛЯЦИЯ (вне сетки - nan)
+    def _interp(self, temp, pres, mol):
+        if np.ndim(temp) == 0 and np.ndim(pres) == 0 and np.ndim(mol) == 0:
+            return self._interp_point(temp, pres, mol)
+
+        index, weight = [], []
+        inside = True
+        for ax, value in zip(self.axes, np.broadcast_arrays(temp, pres, mol)):
+            pos = (np.asarray(value, dtype=float) - ax[0]) / (ax[1] - ax[0])
+            i = np.clip(np.floor(pos).astype(int), 0, len(ax) - 2)
+            inside = inside & (pos >= 0) & (pos <= len(ax) - 1)
+            index.append(i)
+            weight.append(pos - i)
+
+        (i, j, k), (wi, wj, wk) = index, weight
+        out = 0
+        for di, w1 in ((0, 1 - wi), (1, wi)):
+            for dj, w2 in ((0, 1 - wj), (1, wj)):
+                for dk, w3 in ((0, 1 - wk), (1, wk)):
+                    out = out + (w1 * w2 * w3)[..., None] * self.data[i + di, j + dj, k + dk]
+        return np.where(inside[..., None], out, np.nan)
+
+    def _interp_point(self, temp, pres, mol):
+        index, weight = [], []
+        for ax, value in zip(self.axes, (temp, pres, mol)):
+            pos = (value - ax[0]) / (ax[1] - ax[0])
+            if not 0 <= pos <= len(ax) - 1:
+                return np.full(len(self.keys), np.nan)
+            i = min(int(pos), len(ax) - 2)
+            index.append(i)
+            weight.append(pos - i)
+
+        (i, j, k), (wi, wj, wk) = index, weight
+        cube = self.data[i:i + 2, j:j + 2, k:k + 2]
+        w = np.multiply.outer(np.multiply.outer((1 - wi, wi), (1 - wj, wj)), (1 - wk, wk))
+        return np.tensordot(w, cube, 3)
+
+    def tp(self, temp, pressure, mol_CO2):
+        out = self._interp(temp, pressure, mol_CO2)
+        if out.ndim == 1:
+            enth, entr, dens, sp_heat = out.tolist()
+        else:
+            enth, entr, dens, sp_heat = np.moveaxis(out, -1, 0)
+        return State(temp, pressure, enth, entr, dens, sp_heat, float(CP.iphase_supercritical))
+
+        # СОСТОЯНИЕ ЗАДАННОГО СОСТАВА (интерфейс как у FluidState)
+    def state(self, mol_CO2):
+        mol_CO2 = float(mol_CO2)
+        if mol_CO2 not in self._states:
+            self._states[mol_CO2] = _MixTableState(self, mol_CO2)
+        return self._states[mol_CO2]
+
+
+class _MixTableState:
+    # срез таблицы по составу - билинейная интерполяция по (T, P)
+    def __init__(self, table, mol_CO2):
+        self.table = table
+        self.mol_CO2 = mol_CO2
+        ax = table.axes[2]
+        pos = (mol_CO2 - ax[0]) / (ax[1] - ax[0])
+        if not 0 <= pos <= len(ax) - 1:
+            raise ValueError('mol_CO2 = ' + str(mol_CO2) + ' is out of the table range')
+        k = min(int(pos), len(ax) - 2)
+        data = table.data[:, :, k] * (k + 1 - pos) + table.data[:, :, k + 1] * (pos - k)
+        self.data = data
+        self.temp0, self.dtemp = float(table.axes[0][0]), float(table.axes[0][1] - table.axes[0][0])
+        self.pres0, self.dpres = float(table.axes[1][0]), float(table.axes[1][1] - table.axes[1][0])
+        self.shape = data.shape[:2]
+
+    def tp(self, temp, pressure):
+        if np.ndim(temp) or np.ndim(pressure):
+            return self.table.tp(temp, pressure, self.mol_CO2)
+
+        x = (temp - self.temp0) / self.dtemp
+        y = (pressure - self.pres0) / self.dpres
+        if not (0 <= x <= self.shape[0] - 1 and 0 <= y <= self.shape[1] - 1):
+            return State(temp, pressure, np.nan, np.nan, np.nan, np.nan, float(CP.iphase_supercritical))
+        i, j = min(int(x), self.shape[0] - 2), min(int(y), self.shape[1] - 2)
+        x, y = x - i, y - j
+        w00, w01, w10, w11 = (1 - x) * (1 - y), (1 - x) * y, x * (1 - y), x * y
+        # списки python - быстрее массивов numpy для одной точки
+        (d00, d01), (d10, d11) = self.data[i:i + 2, j:j + 2].tolist()
+        enth, entr, dens, sp_heat = [d00[n] * w00 + d01[n] * w01 + d10[n] * w10 + d11[n] * w11
+                                     for n in range(4)]
+        return State(temp, pressure, enth, entr, dens, sp_heat, float(CP.iphase_supercritical))
+
+
+class FluidTable:
+    '''
+    ТАБЛИЦА СВОЙСТВ ЧИСТОГО ВЕЩЕСТВА (backend 'grid')
+
+    Сетка (T, P) со свойствами h, s, rho, cp и фазой (HEOS), билинейная
+    интерполяция, фаза - ближайший узел.
+    .error - оценка погрешности (максимальная относительная ошибка в центрах
+    ячеек относительно HEOS); в двухфазной и околокритической областях
+    таблица не применима
+    '''
+    keys = ('enth', 'entr', 'dens', 'sp_heat', 'phase')
+    _loaded = {}
+
+    def __init__(self, fluid='CO2', temperature=(220., 1200.), pressure=(1e6, 30e6),
+                 shape=(491, 146)):
+        self.fluid = fluid
+        self.axes = [np.linspace(*bounds, num) for bounds, num in
+                     zip((temperature, pressure), shape)]
+        self.data = None
+        self.error = None
+
+        # РАСЧЕТ ТАБЛИЦЫ
+    def build(self, n_check=500, seed=0):
+        temp, pres = np.meshgrid(self.axes[0], self.axes[1], indexing='ij')
+        state = fluid_state(self.fluid, backend='HEOS').tp(temp, pres)
+        self.data = np.stack([getattr(state, key) for key in self.keys], axis=-1)
+
+        # оценка погрешности в центрах случайных ячеек
+        rng = np.random.default_rng(seed)
+        point = [ax[rng.integers(0, len(ax) - 1, n_check)] + (ax[1] - ax[0]) / 2
+                 for ax in self.axes]
+        ref = fluid_state(self.fluid, backend='HEOS').tp(*point)
+        table = self.state()
+        approx = np.array([table.tp(t, p) for t, p in zip(*point)])
+        err = [np.nanmax(np.abs(approx[:, i] / getattr(ref, key) - 1))
+               for i, key in enumerate(self.keys[:-1])]
+        self.error = pd.Series(err, index=self.keys[:-1])
+        return self
+
+        # СОХРАНЕНИЕ / ЗАГРУЗКА
+    def save(self, path):
+        np.savez_compressed(path, fluid=self.fluid, temperature=self.axes[0],
+                            pressure=self.axes[1], data=self.data, error=self.error.to_numpy())
+
+    @classmethod
+    def load(cls, path):
+        file = np.load(path)
+        table = cls.__new__(cls)
+        table.fluid = str(file['fluid'])
+        table.axes = [file['temperature'], file['pressure']]
+        table.data = file['data']
+        table.error = pd.Series(file['error'], index=cls.keys[:-1])
+        return table
+
+    @classmethod
+    def cached(cls, fluid='CO2', name=None, **grid):
+        # таблица загружается один раз на процесс (только чтение)
+        # name - имя файла (по умолчанию - по веществу и параметрам сетки);
+        # загруженная таблица с другой сеткой пересчитывается
+        table = cls(fluid, **grid)
+        name = name or grid_name('fluid_table_' + fluid, table.axes)
+        loaded = cls._loaded.get(name)
+        if loaded is not None and loaded.fluid == fluid and _same_axes(loaded.axes, table.axes):
+            return loaded
+        path = cache_path(name)
+        loaded = cls.load(path) if os.path.exists(path) else None
+        if loaded is None or loaded.fluid != fluid or not _same_axes(loaded.axes, table.axes):
+            loaded = table.build()
+            save_atomic(path, table.save)
+        cls._loaded[name] = loaded
+        return loaded
+
+        # СОСТОЯНИЕ С ИНТЕРФЕЙСОМ AbstractState (для FluidState)
+    def state(self):
+        return _FluidTableState(self)
+
+
+class _FluidTableState:
+    def __init__(self, table):
+        self.table = table
+        self.heos = CP.AbstractState('HEOS', table.fluid)
+        self.temp0, self.dtemp = float(table.axes[0][0]), float(table.axes[0][1] - table.axes[0][0])
+        self.pres0, self.dpres = float(table.axes[1][0]), float(table.axes[1][1] - table.axes[1][0])
+        self.shape = table.data.shape[:2]
+        self.values = None
+
+    def keyed_output(self, key):
+        return self.heos.keyed_output(key)
+
+        # СТОЛБЕЦ ТАБЛИЦЫ ПРИ ДАВЛЕНИИ pressure (линейно между узлами)
+    def _column(self, pressure):
+        y = (pressure - self.pres0) / self.dpres
+        if not 0 <= y <= self.shape[1] - 1:
+            raise ValueError('grid: pressure ' + str(pressure) + ' is out of the table range')
+        j = min(int(y), self.shape[1] - 2)
+        y = y - j
+        return self.table.data[:, j] * (1 - y) + self.table.data[:, j + 1] * y, y
+
+    def tp(self, temp, pressure):
+        x = (temp - self.temp0) / self.dtemp
+        y = (pressure - self.pres0) / self.dpres
+        if not (0 <= x <= self.shape[0] - 1 and 0 <= y <= self.shape[1] - 1):
+            raise ValueError('grid: T = ' + str(temp) + ', P = ' + str(pressure)
+                             + ' is out of the table range')
+        i, j = min(int(x), self.shape[0] - 2), min(int(y), self.shape[1] - 2)
+        x, y = x - i, y - j
+        w00, w01, w10, w11 = (1 - x) * (1 - y), (1 - x) * y, x * (1 - y), x * y
+        (d00, d01), (d10, d11) = self.table.data[i:i + 2, j:j + 2].tolist()
+        enth, entr, dens, sp_heat = [d00[n] * w00 + d01[n] * w01 + d10[n] * w10 + d11[n] * w11
+                                     for n in range(4)]
+        phase = self.table.data[i + round(x), j + round(y), 4]
+        return enth, entr, dens, sp_heat, phase
+
+        # ТЕМПЕРАТУРА ПО СВОЙСТВУ n (h, s) ПРИ ДАВЛЕНИИ - обращение столбца
+    def _invert(self, n, value, pressure):
+        column, _ = self._column(pressure)
+        if not column[0, n] <= value <= column[-1, n]:
+            raise ValueError('grid: ' + self.table.keys[n] + ' = ' + str(value)
+                             + ' is out of the table range')
+        return float(np.interp(value, column[:, n], self.table.axes[0]))
+
+    def update(self, pair, value1, value2):
+        if pair == CP.PT_INPUTS:
+            temp, pressure = value2, value1
+        elif pair == CP.HmassP_INPUTS:
+            temp, pressure = self._invert(0, value1, value2), value2
+        elif pair == CP.PSmass_INPUTS:
+            temp, pressure = self._invert(1, value2, value1), value1
+        else:
+            # прочие пары (насыщение) - HEOS
+            st = self.heos
+            st.update(pair, value1, value2)
+            self.values = (st.T(), st.p(), st.hmass(), st.smass(), st.rhomass(), st.cpmass(),
+                           st.phase())
+            return
+        self.values = (temp, pressure) + self.tp(temp, pressure)
+
+    def T(self):
+        return self.values[0]
+
+    def p(self):
+        return self.values[1]
+
+    def hmass(self):
+        return self.values[2]
+
+    def smass(self):
+        return self.values[3]
+
+    def rhomass(self):
+        return self.values[4]
+
+    def cpmass(self):
+        return self.values[5]
+
+    def phase(self):
+        return self.values[6]
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Jul 27 09:12:40 2024
+
+РАСЧЕТ ТЕМПЕРАТУРЫ СМЕСИ ПО ЭНТАЛЬПИИ / ЭНТРОПИИ
+
+Обратная задача T(p, h), T(p, s):
+    - температура заключена в вилку, которая сужается на каждой итерации
+    - шаг Ньютона по аналитической производной dh/dT = cp, ds/dT = cp / T
+    - если шаг выходит за вилку, не сокращает шаг вдвое или не уменьшает
+      невязку - деление интервала пополам
+    - сходимость - по невязке; нет решения в вилке - nan
+    - теплый старт с предыдущего решения
+    - solve_arr - массив точек итерируется вместе (одно векторное
+      обращение к свойствам на итерацию)
+
+Одно обращение к свойствам на итерации (h, s, cp из одного расчета
+состояния, см. fluidstate).
+
+Температура в К
+"""
+
+import numpy as np
+from allam.fluidstate import fluid_state
+
+
+class TempSolver:
+    def __init__(self, guess=1000., bounds=(250., 2500.), tol=1e-9, maxiter=50,
+                 phase='supercritical'):
+        self.guess = guess # начальное приближение (холодный старт)
+        self.bounds = bounds # вилка по температуре
+        self.tol = tol # относительная точность по температуре
+        self.maxiter = maxiter
+        self.phase = phase # фаза задается явно (как 'T|supercritical')
+        self.reset()
+
+        # СБРОС СЧЕТЧИКОВ И ТЕПЛОГО СТАРТА
+    def reset(self):
+        self.temp = None # последнее решение (теплый старт)
+        self.n_solve = 0 # число решенных задач
+        self.n_iter = 0 # число итераций
+        self.n_calls = 0 # число обращений к свойствам
+
+    def _props(self, state, temp, pressure):
+        self.n_calls += 1
+        try:
+            st = state.tp(temp, pressure)
+        except ValueError:
+            return np.nan, np.nan, np.nan
+        return st.enth, st.entr, st.sp_heat
+
+        # РЕШЕНИЕ T(p, h) / T(p, s)
+    def solve(self, key, pressure, value, fluid, guess=None):
+        # fluid - строка CoolProp или готовое состояние (FluidState, MixTable.state)
+        # нет сходимости (в том числе корень вне bounds) - nan, теплый старт не меняется
+        state = fluid if hasattr(fluid, 'tp') else fluid_state(fluid, backend='HEOS', phase=self.phase)
+        lo, hi = self.bounds
+        # концы вилки, на которых проверен знак невязки
+        lo_ok = hi_ok = False
+        if guess is None:
+            guess = self.guess if self.temp is None else self.temp
+        temp = min(max(guess, lo), hi)
+        self.n_solve += 1
+        step_old = hi - lo
+        f_old = np.inf
+
+        for _ in range(self.maxiter):
+            self.n_iter += 1
+            enth, entr, cp = self._props(state, temp, pressure)
+            if key == 'H':
+                f, dfdt = enth - value, cp
+            else:
+                f, dfdt = entr - value, cp / temp
+            if not np.isfinite(f):
+                return np.nan
+
+            # сходимость - по невязке (оценка погрешности температуры)
+            if abs(f) <= self.tol * temp * abs(dfdt):
+                self.temp = temp
+                return temp
+
+            # сужение вилки (h и s монотонно растут с температурой)
+            if f > 0:
+                hi, hi_ok = temp, True
+            else:
+                lo, lo_ok = temp, True
+            if lo_ok and hi_ok and hi - lo < self.tol * temp:
+                # корень в вилке уже точности (разрыв свойств)
+                self.temp = temp
+                return temp
+
+            # шаг Ньютона; деление пополам, если шаг выходит из вилки,
+            # не уменьшает шаг вдвое или невязка не убывает
+            temp_new = temp - f / dfdt
+            if (not lo < temp_new < hi or abs(temp_new - temp) > step_old / 2
+                    or abs(f) >= f_old):
+                temp_new = (lo + hi) / 2
+            step_old = abs(temp_new - temp)
+            f_old = abs(f)
+            temp = temp_new
+
+        return np.nan
+
+    def temp_h(self, pressure, enthalpy, fluid, guess=None):
+        if np.ndim(enthalpy) or np.ndim(pressure):
+            return self.solve_arr('H', pressure, enthalpy, fluid, guess)
+        return self.solve('H', pressure, enthalpy, fluid, guess)
+
+    def temp_s(self, pressure, entropy, fluid, guess=None):
+        if np.ndim(entropy) or np.ndim(pressure):
+            return self.solve_arr('S', pressure, entropy, fluid, guess)
+        return self.solve('S', pressure, entropy, fluid, guess)
+
+        # РЕШЕНИЕ ДЛЯ МАССИВА ТОЧЕК: ВСЕ ТОЧКИ ИТЕРИРУЮТСЯ ВМЕСТЕ
+        # (одно обращение к свойствам на итерацию для еще не сошедшихся точек,
+        # правила шага и сходимости - как в solve)
+    def solve_arr(self, key, pressure, value, fluid, guess=None):
+        state = fluid if hasattr(fluid, 'tp') else fluid_state(fluid, backend='HEOS', phase=self.phase)
+        pressure, value = np.broadcast_arrays(np.asarray(pressure, dtype=float),
+                                              np.asarray(value, dtype=float))
+        shape = value.shape
+        pressure, value = pressure.ravel(), value.ravel()
+        n = value.size
+        if guess is None:
+            guess = self.guess if self.temp is None else self.temp
+        temp = np.clip(np.broadcast_to(np.asarray(guess, dtype=float), shape).ravel(), *self.bounds)
+        lo, hi = np.full(n, float(self.bounds[0])), np.full(n, float(self.bounds[1]))
+        lo_ok, hi_ok = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+        step_old, f_old = hi - lo, np.full(n, np.inf)
+        out = np.full(n, np.nan)
+        self.n_solve += n
+
+        active = np.arange(n)
+        for _ in range(self.maxiter):
+            if not active.size:
+                break
+            self.n_iter += active.size
+            self.n_calls += active.size
+            t = temp[active]
+            st = state.tp(t, pressure[active])
+            cp = np.asarray(st.sp_heat, dtype=float)
+            if key == 'H':
+                f, dfdt = np.asarray(st.enth, dtype=float) - value[active], cp
+            else:
+                f, dfdt = np.asarray(st.entr, dtype=float) - value[active], cp / t
+
+            # сходимость - по невязке; расчет свойств не удался - nan
+            with np.errstate(invalid='ignore'):
+                done = ~np.isfinite(f) | (np.abs(f) <= self.tol * t * np.abs(dfdt))
+                found = done & np.isfinite(f)
+
+                # сужение вилки (h и s монотонно растут с температурой)
+                up = f > 0
+                hi[active[up]], hi_ok[active[up]] = t[up], True
+                lo[active[~up]], lo_ok[active[~up]] = t[~up], True
+                a_lo, a_hi = lo[active], hi[active]
+                narrow = ~done & lo_ok[active] & hi_ok[active] & (a_hi - a_lo < self.tol * t)
+                found |= narrow
+                done |= narrow
+                out[active[found]] = t[found]
+
+                # шаг Ньютона или деление пополам
+                t_new = t - f / dfdt
+                bisect = (~((a_lo < t_new) & (t_new < a_hi)) | (np.abs(t_new - t) > step_old[active] / 2)
+                          | (np.abs(f) >= f_old[active]))
+                t_new = np.where(bisect, (a_lo + a_hi) / 2, t_new)
+            step_old[active] = np.abs(t_new - t)
+            f_old[active] = np.abs(f)
+            temp[active] = t_new
+            active = active[~done]
+
+        solved = out[np.isfinite(out)]
+        if solved.size:
+            self.temp = float(solved[-1])
+        return out.reshape(shape)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Sep  8 11:40:27 2024
+
+T-s И h-s ДИАГРАММЫ ЦИКЛА
+
+cycle_paths - линии процессов между точками цикла по результату
+в памяти (Acycle, CycleResult) или DataFrame / файлу .csv
+    - теплообмен: T и P меняются линейно, свойства - один векторный
+      расчет на участок (смесь - точки 0-2, CO2 - точки 3-7)
+    - турбина, компрессор: s меняется линейно по P, температура -
+      TempSolver с теплым стартом от соседней точки
+    - сепаратор (2-3) и камера сгорания (7-0) - смена состава,
+      только соединение точек
+plot_cycle_diagram - построение T-s или h-s диаграммы (купол насыщения CO2
+из кэша saturation_dome)
+
+Температура в К, давление в Pa
+"""
+
+from collections import namedtuple
+import numpy as np
+import matplotlib.pyplot as plt
+from allam.cyclecore import CycleResult, cycle_frame, cycle_mix_state
+from allam.fluidstate import fluid_state
+from allam.tempsolver import TempSolver
+from allam.saturation import saturation_dome
+
+CyclePath = namedtuple('CyclePath', ['start', 'end', 'fluid', 'temp', 'pres', 'enth', 'entr'])
+
+# участки цикла: начало, конец, рабочее тело (None - только соединение точек),
+# процесс ('tp' - теплообмен, 'ps' - турбина / компрессор)
+cycle_segments = ((0, 1, 'mix', 'ps'), (1, 2, 'mix', 'tp'), (2, 3, None, None),
+                  (4, 5, 'CO2', 'tp'), (5, 6, 'CO2', 'ps'), (6, 7, 'CO2', 'tp'),
+                  (7, 0, None, None))
+
+
+    # ЛИНИИ ПРОЦЕССОВ
+def cycle_paths(cycle, n=50):
+    # n - число точек на участке
+    result = getattr(cycle, 'result', cycle)
+    p = cycle_frame(cycle)
+    if isinstance(result, CycleResult):
+        mix = cycle_mix_state(result.mol_CO2, result.inputs.mix_table, result.fluid)
+        co2 = fluid_state('CO2', backend=result.inputs.backend)
+    else:
+        mix = cycle_mix_state(round(float(p.CO2[0]), 3))
+        co2 = fluid_state('CO2')
+    states = {'mix': mix, 'CO2': co2}
+
+    temp, pres = p.temp.to_numpy(dtype=float), p.pres.to_numpy(dtype=float)
+    enth, entr = p.enth.to_numpy(dtype=float), p.entr.to_numpy(dtype=float)
+    paths = []
+    for start, end, fluid, process in cycle_segments:
+        if fluid is None:
+            points = [start, end]
+            paths.append(CyclePath(start, end, fluid, temp[points], pres[points],
+                                   enth[points], entr[points]))
+            continue
+        pr = np.linspace(pres[start], pres[end], n)
+        if process == 'ps':
+            solver = TempSolver(guess=temp[start])
+            t = solver.solve_arr('S', pr, np.linspace(entr[start], entr[end], n), states[fluid])
+        else:
+            t = np.linspace(temp[start], temp[end], n)
+        t[[0, -1]] = temp[[start, end]]
+        state = states[fluid].tp(t, pr)
+        h, s = np.array(state.enth, dtype=float), np.array(state.entr, dtype=float)
+        # концы участка - точно по точкам цикла
+        h[[0, -1]], s[[0, -1]] = enth[[start, end]], entr[[start, end]]
+        paths.append(CyclePath(start, end, fluid, t, pr, h, s))
+    return paths
+
+
+    # T-s / h-s ДИАГРАММА
+def plot_cycle_diagram(cycle, kind='Ts', n=50, ax=None, file_name=None):
+    # kind - 'Ts' или 'hs'
+    if kind not in ('Ts', 'hs'):
+        raise ValueError("plot_cycle_diagram: kind 'Ts' or 'hs' is expected, got " + str(kind))
+    y = 'temp' if kind == 'Ts' else 'enth'
+    if ax is None:
+        plt.figure(figsize=(5, 4))
+        ax = plt.gca()
+
+    # купол насыщения CO2
+    dome = saturation_dome('CO2')
+    ax.plot(dome.entr_liq, dome.temp if kind == 'Ts' else dome.enth_liq, 'grey')
+    ax.plot(dome.entr_vap, dome.temp if kind == 'Ts' else dome.enth_vap, 'grey')
+
+    colors = {'mix': 'r', 'CO2': 'b', None: 'k'}
+    for path in cycle_paths(cycle, n=n):
+        ax.plot(path.entr, getattr(path, y), colors[path.fluid],
+                linestyle='-' if path.fluid else '--', lw=1)
+
+    p = cycle_frame(cycle)
+    ax.scatter(p.entr, p[y], color='b', s=10) # точки
+    for i in p.index:
+        ax.annotate(str(i), (p.entr[i], p[y][i]), textcoords='offset points', xytext=(4, 4),
+                    fontsize=8)
+
+    ax.minorticks_on()
+    ax.set_xlabel('Entropy [J/(kg K)]')
+    ax.set_ylabel('Temperature [K]' if kind == 'Ts' else 'Enthalpy [J/kg]')
+    ax.grid(linestyle='--', linewidth=0.5, color='black') # сетка
+    plt.tight_layout() # оптимизируем поля и расположение объектов
+    if file_name is not None:
+        plt.savefig(file_name, dpi=300)
+    return ax
@@ -4,6 +4,37 @@ sco = Acycle()
 sco.cycle(pressure_min=8e6, pressure_rate=2.2, temperature=(310,1073,900))
 print(sco.p)
 print(sco.g)
+sco.save() # cycle.csv, cycle_g.csv for main_recuperator, main_phasediagram_cycle
+
+# Cycle with a given recuperator pinch (temp_recyc is found)
+sco.cycle(pressure_min=8e6, pressure_rate=2.2, temperature=(310,1073), pinch=10)
+print(sco.p.temp[7], sco.profile.pinch)
+sco.cycle(pressure_min=8e6, pressure_rate=2.2, temperature=(310,1073,900))
 
 sco.efc_temp_recyc(var_temp_recyc=(500,900), pressure_min=8e6, pressure_rate=2.2, temperature=(310,1073))
-# sco.efc_temp_heat(var_temp_heat=(700,1000), pressure_min=8e6, pressure_rate=2.2, temperature=(310,600))
\ No newline at end of file
+# sco.efc_temp_heat(var_temp_heat=(700,1000), pressure_min=8e6, pressure_rate=2.2, temperature=(310,600))
+# Batch calculation of cycle parameters
+import numpy as np
+p, g = sco.cycle_batch(pressure_min=8e6, pressure_rate=2.2, temperature=(310, 1073, np.linspace(500, 900, 50)))
+print(g['efc_cycle'])
+
+# Part-load operation
+from allam import PartLoad
+sco.cycle(pressure_min=8e6, pressure_rate=2.2, temperature=(310,1073,900))
+plant = PartLoad(sco, power=50000)
+res = plant.dispatch(30000 + 20000 * np.sin(np.linspace(0, np.pi, 1440))**2)
+print(res[['power', 'mfr', 'pressure_min', 'efc_cycle']])
+
+# Parameter sweep (process pool - under the main guard for Windows)
+from allam import cycle_sweep, plot_sweep
+if __name__ == '__main__':
+    res = cycle_sweep(grid={'pressure_min': np.linspace(7.5e6, 9e6, 20),
+                            'temp_recyc': np.linspace(500, 900, 60)},
+                      fixed={'pressure_rate': 2.2, 'temp_compr': 310, 'temp_turb': 1073})
+    plot_sweep(res, 'efc_cycle', file_name='efc_map.png')
+
+    # Optimization of cycle parameters
+    res = sco.optim(bounds={'pressure_min': (7.5e6, 10e6), 'pressure_rate': (1.8, 4.),
+                            'temp_turb': (1000, 1400), 'temp_recyc': (600, 1000)},
+                    fixed={'temp_compr': 305}, pinch_min=10, n_jobs=4)
+    print(res.x, res.efc_cycle, res.pinch)
@@ -12,4 +12,14 @@ print(comb.gas)
 print(comb.g)
 print(comb.gas_in)
 
-comb.tempAlphaPl(k_recyc=(5, 25), temp_recyc=580)
\ No newline at end of file
+comb.tempAlphaPl(k_recyc=(5, 25), temp_recyc=580)
+
+# Vectorized calculation
+import numpy as np
+k_recyc, comp = comb.burnArr(temp_gas=1073, temp_recyc=np.linspace(500, 900, 100))
+print(k_recyc, comp['mol_CO2'])
+# Fuel mixture
+comb = Combust(fuel={'CH4': 0.9, 'C2H6': 0.05, 'N2': 0.05},
+               oxidant={'O2': 0.995, 'Ar': 0.005}, excess_O2=0.02)
+k_recyc = comb.burnAlpha(temp_gas=1073, temp_recyc=900)
+print(f'Recirculation coefficient {k_recyc:.2f}', comb.fluidMix())
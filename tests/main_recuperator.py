@@ -4,6 +4,15 @@ rec = HeatEx()
 
 # rec.spheat()
 
-rec.solve()
+rec.solve(tol=0.01) # адаптивное деление участков у пика cp
 
-print(rec.r)
\ No newline at end of file
+print(rec.r)
+print(f'Minimum temperature difference {rec.pinch:.2f} K at x = {rec.x_pinch:.2f}')
+
+# Recuperator rating
+from allam import Acycle, Recuperator
+sco = Acycle()
+sco.cycle(pressure_min=8e6, pressure_rate=2.2, temperature=(310, 1073, 900))
+recup = Recuperator.from_cycle(sco.result)
+sco.cycle_rated(pressure_min=8.5e6, pressure_rate=2.2, temperature=(310, 1073, 900), recup=recup)
+print(sco.rating)